@@ -0,0 +1,65 @@
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def peak_rss_mb():
+    """Peak resident set size of the current process in MB (Linux reports KB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(module: str, *args):
+    """Run one benchmark case in a fresh interpreter so peak RSS is not shared.
+
+    The child prints a single JSON object on its last stdout line.
+    """
+    cmd = [sys.executable, "-m", module, "--child", *[str(a) for a in args]]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr else "child failed"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def time_calls(fn, inputs):
+    """Call fn once per input and return per-call latencies in milliseconds."""
+    latencies = []
+    for item in inputs:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def latency_summary(latencies_ms):
+    return {
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+    }
+
+
+def synthetic_crop_features(rows: int, seed: int = 42):
+    """Random rows shaped like all_crops.parquet: N, P, K, temp, pH, rainfall."""
+    rng = np.random.default_rng(seed)
+    features = np.column_stack([
+        rng.uniform(0, 140, rows),     # N_kg_ha
+        rng.uniform(5, 145, rows),     # P_kg_ha
+        rng.uniform(5, 205, rows),     # K_kg_ha
+        rng.uniform(8, 44, rows),      # avg_temp_C
+        rng.uniform(3.5, 9.9, rows),   # soil_ph
+        rng.uniform(20, 300, rows),    # avg_rainfall_mm
+    ])
+    crops = np.array(["rice", "wheat", "maize", "cotton", "mango", "banana", "coffee"], dtype=object)
+    labels = crops[rng.integers(0, len(crops), rows)]
+    return features, labels
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    for r in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(r, widths)))
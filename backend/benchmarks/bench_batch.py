@@ -0,0 +1,67 @@
+"""Throughput of the batch crop recommendation path.
+
+Runs the same soil samples through one get_top_matching_crops call per sample
+(what partner apps do today via /predict-json) and through a single
+get_top_matching_crops_batch call, on a synthetic dataset.
+
+    python -m backend.benchmarks.bench_batch --rows 1000000 --batch-sizes 100 1000 5000
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from backend.benchmarks._common import print_table, synthetic_crop_features
+
+
+def _load_predictor(rows: int):
+    from backend.services import predictor
+
+    features, labels = synthetic_crop_features(rows)
+    scaler = StandardScaler()
+    scaled = scaler.fit_transform(features)
+    codes, names = pd.factorize(labels)
+    predictor.crop_index_resource.set(
+        predictor.CropIndex(scaled.astype(np.float32), codes, names, scaler, version="bench")
+    )
+    return predictor, features
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args()
+
+    predictor, features = _load_predictor(args.rows)
+    rng = np.random.default_rng(7)
+
+    table = []
+    for size in args.batch_sizes:
+        samples = (features[rng.integers(0, args.rows, size)] + rng.normal(0, 1, (size, 6))).tolist()
+
+        predictor.recommendation_cache.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            single = [predictor.get_top_matching_crops(s) for s in samples]
+            single_s = time.perf_counter() - start
+
+        predictor.recommendation_cache.clear()
+        start = time.perf_counter()
+        batch = predictor.get_top_matching_crops_batch(samples)
+        batch_s = time.perf_counter() - start
+
+        same = all([c["crop"] for c in a] == [c["crop"] for c in b] for a, b in zip(single, batch))
+        table.append([size, round(size / single_s, 1), round(size / batch_s, 1),
+                      round(single_s / batch_s, 1), same])
+
+    print(f"rows={args.rows}")
+    print_table(["batch", "per_request_samples_s", "batch_samples_s", "speedup", "same_top_crops"], table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Community feed latency as the forum grows.
+
+Seeds a throwaway SQLite database per size with posts and comments, then
+times the keyset feed (first page and a page from the middle of the
+history) and, for small sizes, the previous load-everything view with lazy
+per-post comment loading.
+
+    python -m backend.benchmarks.bench_community_feed --posts 1000 100000 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from backend.benchmarks._common import latency_summary, print_table
+from backend.community.feed import encode_cursor, load_feed_page
+from backend.community.models import Base, Comment, CommunityPost, ensure_indexes
+
+LEGACY_MAX_POSTS = 10_000
+SEED_CHUNK = 50_000
+
+
+def seed(engine, posts: int, comments_per_post: int):
+    start = datetime(2024, 1, 1)
+    rng = np.random.default_rng(0)
+    with engine.begin() as conn:
+        for lo in range(0, posts, SEED_CHUNK):
+            ids = range(lo + 1, min(posts, lo + SEED_CHUNK) + 1)
+            conn.execute(insert(CommunityPost), [
+                {"id": i, "name": "bench", "title": f"Post {i}", "content": "Leaves turning yellow after rain",
+                 "category": "Crop", "created_at": start + timedelta(seconds=i * 30)}
+                for i in ids
+            ])
+            conn.execute(insert(Comment), [
+                {"post_id": i, "commenter": "bench", "content": "Try neem oil",
+                 "created_at": start + timedelta(seconds=i * 30 + int(s))}
+                for i in ids for s in rng.integers(1, 10_000, comments_per_post)
+            ])
+
+
+def _legacy(db):
+    posts = db.query(CommunityPost).order_by(CommunityPost.created_at.desc()).all()
+    for post in posts:
+        list(post.comments)
+    return posts
+
+
+def _time(fn, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latency_summary(np.array(latencies))
+
+
+def run(posts: int, comments_per_post: int, repeats: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        ensure_indexes(engine)
+        seed(engine, posts, comments_per_post)
+        Session = sessionmaker(bind=engine)
+
+        rows = []
+        with Session() as db:
+            middle = db.scalars(
+                select(CommunityPost).order_by(CommunityPost.created_at.desc(), CommunityPost.id.desc())
+                .offset(posts // 2).limit(1)
+            ).first()
+            cases = {"keyset_first": None, "keyset_middle": encode_cursor(middle)}
+            for name, cursor in cases.items():
+                rows.append([posts, name, *_time(lambda: load_feed_page(db, cursor), repeats).values()])
+                db.expunge_all()
+            if posts <= LEGACY_MAX_POSTS:
+                rows.append([posts, "legacy_all", *_time(lambda: (_legacy(db), db.expunge_all()), repeats).values()])
+        engine.dispose()
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--comments-per-post", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    table = []
+    for posts in args.posts:
+        table.extend(run(posts, args.comments_per_post, args.repeats))
+    print_table(["posts", "case", "p50_ms", "p95_ms", "p99_ms"], table)
+
+
+if __name__ == "__main__":
+    main()
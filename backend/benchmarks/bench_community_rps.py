@@ -0,0 +1,144 @@
+"""Requests/sec of the community routes under mixed read/write traffic.
+
+Drives the ASGI app in-process with concurrent clients, against a throwaway
+SQLite file:
+
+- "sync" is the previous handler style: the feed is a sync route in the
+  threadpool, and comments are added from async routes through a blocking
+  Session, so each commit stalls the event loop.
+- "async" is backend/community/routes.py on async sessions.
+
+    python -m backend.benchmarks.bench_community_rps --seconds 15 --concurrency 32 --read-ratio 0.8
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from backend.benchmarks._common import latency_summary, print_table
+
+
+def _legacy_app():
+    from fastapi import Depends, FastAPI, Form, Query
+    from fastapi.responses import RedirectResponse
+    from sqlalchemy.orm import Session
+    from datetime import datetime
+
+    from backend.community.feed import PAGE_SIZE, load_feed_page, serialize_post
+    from backend.community.models import Comment
+    from backend.database.db import get_db
+
+    app = FastAPI()
+
+    @app.get("/api/community/feed")
+    def feed(cursor: str = Query(None), limit: int = Query(PAGE_SIZE), db: Session = Depends(get_db)):
+        posts, next_cursor = load_feed_page(db, cursor, limit)
+        return {"posts": [serialize_post(p) for p in posts], "next_cursor": next_cursor}
+
+    @app.post("/community/comment/{post_id}")
+    async def add_comment(post_id: int, commenter: str = Form("Anonymous"), content: str = Form(...),
+                          db: Session = Depends(get_db)):
+        db.add(Comment(post_id=post_id, commenter=commenter, content=content, created_at=datetime.utcnow()))
+        db.commit()
+        return RedirectResponse(url="/community", status_code=303)
+
+    return app
+
+
+def _async_app():
+    from fastapi import FastAPI
+
+    from backend.community import routes
+
+    app = FastAPI()
+    app.include_router(routes.router)
+    return app
+
+
+def _seed(posts: int):
+    from datetime import datetime, timedelta
+
+    from backend.community.models import Base, CommunityPost, ensure_indexes
+    from backend.database.db import SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes(engine)
+    start = datetime(2024, 1, 1)
+    with SessionLocal() as db:
+        db.add_all([
+            CommunityPost(name="bench", title=f"Post {i}", content="Leaf spots after rain", category="Crop",
+                          created_at=start + timedelta(minutes=i))
+            for i in range(posts)
+        ])
+        db.commit()
+
+
+async def _drive(app, seconds: float, concurrency: int, read_ratio: float, posts: int):
+    import httpx
+
+    latencies = {"read": [], "write": []}
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client_loop(client, rng):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            kind = "read" if rng.random() < read_ratio else "write"
+            start = time.perf_counter()
+            if kind == "read":
+                response = await client.get("/api/community/feed")
+            else:
+                response = await client.post(f"/community/comment/{rng.randint(1, posts)}",
+                                             data={"commenter": "bench", "content": "Try neem oil"})
+            if response.status_code >= 400:
+                errors += 1
+            latencies[kind].append((time.perf_counter() - start) * 1000)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await asyncio.gather(*(client_loop(client, random.Random(i)) for i in range(concurrency)))
+
+    # Pooled async connections belong to this event loop.
+    from backend.database.db import async_engine
+    await async_engine.dispose()
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--read-ratio", type=float, default=0.8)
+    parser.add_argument("--posts", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before backend.database.db creates its engines.
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        _seed(args.posts)
+
+        table = []
+        for name, make_app in (("sync", _legacy_app), ("async", _async_app)):
+            latencies, errors = asyncio.run(
+                _drive(make_app(), args.seconds, args.concurrency, args.read_ratio, args.posts)
+            )
+            total = len(latencies["read"]) + len(latencies["write"])
+            row = [name, round(total / args.seconds, 1)]
+            for kind in ("read", "write"):
+                summary = latency_summary(np.array(latencies[kind] or [0.0]))
+                row += [summary["p50_ms"], summary["p99_ms"]]
+            table.append(row + [errors])
+
+        from backend.database.db import engine
+        engine.dispose()
+
+    print(f"concurrency={args.concurrency} read_ratio={args.read_ratio} seconds={args.seconds}")
+    print_table(["handlers", "rps", "read_p50_ms", "read_p99_ms", "write_p50_ms", "write_p99_ms", "errors"], table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Latency of the model-backed crop recommender against the k-NN index.
+
+For each dataset size a HistGradientBoosting classifier is trained on a
+sample of the synthetic rows and both paths answer the same queries: one
+request at a time and as one batch, plus a burst of concurrent requests that
+go through the model's micro-batcher. k-NN cost grows with rows; the model's
+does not.
+
+    python -m backend.benchmarks.bench_crop_model --rows 100000 1000000 5000000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.preprocessing import StandardScaler
+
+from backend.benchmarks._common import (
+    latency_summary, print_table, run_child, synthetic_crop_features, time_calls,
+)
+
+MODULE = "backend.benchmarks.bench_crop_model"
+
+
+def _setup(rows: int, train_rows: int):
+    from backend.services import crop_model, predictor
+
+    features, labels = synthetic_crop_features(rows)
+    scaler = StandardScaler()
+    scaled = scaler.fit_transform(features)
+    codes, names = pd.factorize(labels)
+    predictor.crop_index_resource.set(
+        predictor.CropIndex(scaled.astype(np.float32), codes, names, scaler, version="bench")
+    )
+    # Measure the index itself, not the result cache in front of it.
+    predictor.recommendation_cache.max_entries = 0
+
+    sample = np.random.default_rng(0).choice(rows, min(rows, train_rows), replace=False)
+    model = HistGradientBoostingClassifier(max_iter=100, max_depth=15, random_state=42)
+    model.fit(scaled[sample], labels[sample])
+    crop_model.crop_model_resource.set(crop_model.CropModel(model, scaler, version="bench"))
+    return crop_model, predictor, features
+
+
+async def _burst(crop_model, inputs):
+    start = time.perf_counter()
+    await asyncio.gather(*(crop_model.recommend_crops(list(x), "model") for x in inputs))
+    return time.perf_counter() - start
+
+
+def child(rows: int, queries: int, train_rows: int):
+    crop_model, predictor, features = _setup(rows, train_rows)
+    rng = np.random.default_rng(7)
+    inputs = features[rng.integers(0, rows, queries)] + rng.normal(0, 1, (queries, 6))
+
+    result = {"rows": rows}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for mode in ("knn", "model"):
+            latencies = time_calls(lambda x: crop_model.recommend_crops_batch([list(x)], mode), inputs)
+            start = time.perf_counter()
+            crop_model.recommend_crops_batch(inputs.tolist(), mode)
+            batch_s = time.perf_counter() - start
+            result[mode] = {**latency_summary(latencies), "batch_samples_s": round(queries / batch_s, 1)}
+        burst_s = asyncio.run(_burst(crop_model, inputs))
+        result["model"]["concurrent_samples_s"] = round(queries / burst_s, 1)
+        result["model"]["mean_batch_size"] = crop_model.crop_model_batcher.stats()["mean_batch_size"]
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--train-rows", type=int, default=200_000, help="rows sampled to fit the model")
+    parser.add_argument("--child", nargs=1, metavar="ROWS")
+    args = parser.parse_args()
+
+    if args.child:
+        child(int(args.child[0]), args.queries, args.train_rows)
+        return
+
+    table = []
+    for rows in args.rows:
+        r = run_child(MODULE, rows, "--queries", args.queries, "--train-rows", args.train_rows)
+        for mode in ("knn", "model"):
+            m = r.get(mode, {})
+            table.append([rows, mode, m.get("p50_ms"), m.get("p95_ms"), m.get("p99_ms"),
+                          m.get("batch_samples_s"), m.get("concurrent_samples_s", ""), r.get("error", "")])
+    print_table(["rows", "mode", "p50_ms", "p95_ms", "p99_ms", "batch_samples_s", "concurrent_samples_s", "error"],
+                table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Decode + transform time and peak memory per image size class.
+
+Compares the old full decode + ``transforms.Resize((224, 224))`` + ``ToTensor``
+against backend/disease_model/preprocess.py (JPEG draft decoding), on synthetic
+phone-style JPEGs. The JPEGs are written up front and each case runs in its
+own interpreter, so peak RSS only reflects decoding.
+
+    python -m backend.benchmarks.bench_disease_decode --repeats 20
+"""
+import argparse
+import json
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from backend.benchmarks._common import peak_rss_mb, print_table, run_child
+
+MODULE = "backend.benchmarks.bench_disease_decode"
+
+SIZE_CLASSES = {
+    "0.3MP": (640, 480),
+    "3MP": (2048, 1536),
+    "12MP": (4000, 3000),
+    "24MP": (6000, 4000),
+}
+
+
+def _synthetic_jpeg(width, height, path):
+    # Smooth gradients plus mild noise compress like a real leaf photo.
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 235, width, dtype=np.float32)
+    y = np.linspace(0, 235, height, dtype=np.float32)[:, None]
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    pixels[..., 0] = x
+    pixels[..., 1] = x * 0.3 + y * 0.7
+    pixels[..., 2] = 235 - y
+    pixels += rng.integers(0, 16, pixels.shape, dtype=np.uint8)
+    Image.fromarray(pixels).save(path, "JPEG", quality=90)
+
+
+def _legacy(contents):
+    import torchvision.transforms as transforms
+
+    transform = transforms.Compose([transforms.Resize((224, 224)), transforms.ToTensor()])
+    return transform(Image.open(BytesIO(contents)).convert("RGB"))
+
+
+def _fast(contents):
+    from backend.disease_model.preprocess import load_image_tensor
+
+    return load_image_tensor(BytesIO(contents))
+
+
+def child(mode: str, path: str, repeats: int):
+    contents = Path(path).read_bytes()
+    fn = _legacy if mode == "legacy" else _fast
+    if mode == "legacy":
+        import torchvision.transforms  # noqa: F401  (import cost is not decode cost)
+    else:
+        import backend.disease_model.preprocess  # noqa: F401
+    base_rss = peak_rss_mb()
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(contents)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    print(json.dumps({
+        "jpeg_kb": round(len(contents) / 1024, 1),
+        "mean_ms": round(float(np.mean(timings)), 2),
+        "p95_ms": round(float(np.percentile(timings, 95)), 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "decode_rss_mb": round(peak_rss_mb() - base_rss, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=list(SIZE_CLASSES))
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"))
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], args.repeats)
+        return
+
+    table = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_class in args.sizes:
+            path = Path(tmp) / f"{size_class}.jpg"
+            _synthetic_jpeg(*SIZE_CLASSES[size_class], path)
+            for mode in ("legacy", "fast"):
+                r = run_child(MODULE, mode, path, "--repeats", args.repeats)
+                table.append([size_class, mode, r.get("jpeg_kb"), r.get("mean_ms"), r.get("p95_ms"),
+                              r.get("peak_rss_mb"), r.get("decode_rss_mb"), r.get("error", "")])
+    print_table(["size", "mode", "jpeg_kb", "mean_ms", "p95_ms", "peak_rss_mb", "decode_rss_mb", "error"], table)
+
+
+if __name__ == "__main__":
+    main()
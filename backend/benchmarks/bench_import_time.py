@@ -0,0 +1,60 @@
+"""Cold import cost of backend.main, grouped by top-level package.
+
+Runs ``python -X importtime -c "import backend.main"`` in a fresh interpreter
+and sums the self time of every module under its top-level package, so heavy
+imports (torch, pandas, sklearn) that sneak back into module scope show up.
+
+    python -m backend.benchmarks.bench_import_time --top 15
+"""
+import argparse
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from backend.benchmarks._common import print_table
+
+
+def import_profile(module: str):
+    cmd = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr.strip().splitlines()[-1])
+
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    self_us = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        self_us[name.strip()] = int(own)
+    return wall, self_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="backend.main")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    wall, self_us = import_profile(args.module)
+    by_package = defaultdict(int)
+    for name, us in self_us.items():
+        by_package[name.split(".")[0]] += us
+
+    print(f"✅ import {args.module}: {wall * 1000:.0f} ms wall, {len(self_us)} modules")
+    print_table(
+        ["package", "self_ms"],
+        [[pkg, round(us / 1000, 1)] for pkg, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:args.top]],
+    )
+    print()
+    print_table(
+        ["module", "self_ms"],
+        [[name, round(us / 1000, 1)] for name, us in sorted(self_us.items(), key=lambda kv: -kv[1])[:args.top]],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Per-request latency and peak RSS of the crop k-NN lookup.
+
+Compares the previous brute-force path (copy the scaled frame, run
+euclidean_distances over every row, nsmallest) against the KD-tree index in
+backend/services/predictor.py on synthetic datasets.
+
+    python -m backend.benchmarks.bench_knn --rows 100000 1000000 5000000
+"""
+import argparse
+import contextlib
+import io
+import json
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import euclidean_distances
+from sklearn.preprocessing import StandardScaler
+
+from backend.benchmarks._common import (
+    latency_summary, peak_rss_mb, print_table, run_child, synthetic_crop_features, time_calls,
+)
+
+MODULE = "backend.benchmarks.bench_knn"
+
+
+def _brute_force_setup(features, labels):
+    from backend.services import predictor
+
+    cols = predictor.dataset_feature_cols
+    crop_df = pd.DataFrame(features, columns=cols)
+    crop_df[predictor.label_col] = labels
+    scaler = StandardScaler()
+    crop_df_scaled = crop_df.copy()
+    crop_df_scaled[cols] = scaler.fit_transform(crop_df[cols])
+
+    def query(user_input, top_n=5):
+        input_df = pd.DataFrame([user_input], columns=cols).fillna(0)
+        input_scaled = scaler.transform(input_df)
+        df_copy = crop_df_scaled.copy()
+        distances = euclidean_distances(df_copy[cols].values, input_scaled).flatten()
+        df_copy["distance"] = distances
+        top_matches = df_copy.nsmallest(top_n, "distance")
+        return [
+            {"crop": row[predictor.label_col],
+             "similarity": round(100 - row["distance"] * 100, 2),
+             "tips": predictor.get_crop_tips(row[predictor.label_col])}
+            for _, row in top_matches.iterrows()
+        ]
+
+    return query
+
+
+def _kdtree_setup(features, labels):
+    from backend.services import predictor
+
+    scaler = StandardScaler()
+    scaled = scaler.fit_transform(features)
+    codes, names = pd.factorize(labels)
+    predictor.crop_index_resource.set(
+        predictor.CropIndex(scaled.astype(np.float32), codes, names, scaler, version="bench")
+    )
+    # Measure the index itself, not the result cache in front of it.
+    predictor.recommendation_cache.max_entries = 0
+    return predictor.get_top_matching_crops
+
+
+def child(mode: str, rows: int, queries: int):
+    features, labels = synthetic_crop_features(rows)
+    rng = np.random.default_rng(7)
+    inputs = features[rng.integers(0, rows, queries)] + rng.normal(0, 1, (queries, 6))
+    base_rss = peak_rss_mb()
+
+    setup = _brute_force_setup if mode == "brute" else _kdtree_setup
+    with contextlib.redirect_stdout(io.StringIO()):
+        query = setup(features, labels)
+        latencies = time_calls(lambda x: query(list(x)), inputs)
+
+    result = {"mode": mode, "rows": rows, "peak_rss_mb": round(peak_rss_mb(), 1),
+              "rss_over_data_mb": round(peak_rss_mb() - base_rss, 1)}
+    result.update(latency_summary(latencies))
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "ROWS"))
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], int(args.child[1]), args.queries)
+        return
+
+    table = []
+    for rows in args.rows:
+        for mode in ("brute", "kdtree"):
+            r = run_child(MODULE, mode, rows, "--queries", args.queries)
+            table.append([rows, mode, r.get("p50_ms"), r.get("p95_ms"), r.get("p99_ms"),
+                          r.get("peak_rss_mb"), r.get("rss_over_data_mb"), r.get("error", "")])
+    print_table(["rows", "mode", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb", "rss_over_data_mb", "error"], table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Latency of /predict-location lookups: materialized buckets vs live k-NN.
+
+Needs backend/data/all_crops.parquet and a location_recs.npz built with
+``python -m backend.build_location_recs``.
+
+    python -m backend.benchmarks.bench_location_recs --queries 5000
+"""
+import argparse
+import contextlib
+import io
+
+import numpy as np
+
+from backend.benchmarks._common import latency_summary, print_table, time_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=5000)
+    args = parser.parse_args()
+
+    from backend.services import predictor
+    from backend.services.location_recs import get_location_recs
+    from backend.services.locations import get_location_index
+
+    index = get_location_index()
+    recs = get_location_recs()
+    if index.empty or not recs.available:
+        raise SystemExit("❌ Need the feature store and a matching location_recs.npz")
+
+    rng = np.random.default_rng(7)
+    keys = list(index.exact)
+    queries = [(keys[i], float(t)) for i, t in zip(rng.integers(0, len(keys), args.queries),
+                                                   rng.uniform(10, 40, args.queries))]
+
+    def materialized(q):
+        (state, district, season), temperature = q
+        return recs.lookup(index.lookup_row(state, district, season), temperature)
+
+    def live(q):
+        (state, district, season), temperature = q
+        values = list(index.features(index.lookup_row(state, district, season)))
+        values[3] = temperature
+        return predictor.get_top_matching_crops(values)
+
+    predictor.recommendation_cache.max_entries = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows = [["materialized", *latency_summary(time_calls(materialized, queries)).values()],
+                ["live", *latency_summary(time_calls(live, queries)).values()]]
+    print_table(["path", "p50_ms", "p95_ms", "p99_ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Precompute /predict-location answers for every location and temperature bucket.
+
+    python -m backend.build_location_recs --bucket-width 1.0 --min-temp 0 --max-temp 50
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from backend.services import predictor
+from backend.services.feature_store import get_feature_store
+from backend.services.location_recs import LOCATION_RECS_PATH
+from backend.services.locations import get_location_index
+
+
+def build(bucket_width: float, temp_min: float, temp_max: float, top_n: int, output):
+    store = get_feature_store()
+    crop_index = predictor.get_crop_index()
+    if crop_index.empty:
+        raise SystemExit("❌ Feature store is empty — nothing to materialize.")
+
+    index = get_location_index()
+    rows = np.array(sorted(set(index.exact.values()) | set(index.fallback.values())), dtype=np.int64)
+    n_buckets = int(np.ceil((temp_max - temp_min) / bucket_width))
+    centres = temp_min + (np.arange(n_buckets) + 0.5) * bucket_width
+    print(f"✅ {len(rows)} locations × {n_buckets} buckets of {bucket_width}°C")
+
+    crop_codes = np.full((len(rows), n_buckets, top_n), -1, dtype=np.int16)
+    similarity = np.zeros((len(rows), n_buckets, top_n), dtype=np.float32)
+
+    start = time.perf_counter()
+    for i, row in enumerate(rows):
+        base = index.features(int(row))
+        # Snap like the live path so a bucket answer equals a live answer at its centre.
+        inputs = [predictor.quantize_input(base[:3] + [t] + base[4:]) for t in centres]
+        distances, indices = crop_index.query_nearest(crop_index.transform(inputs), top_n)
+        k = distances.shape[1]
+        crop_codes[i, :, :k] = crop_index.crop_codes[indices]
+        similarity[i, :, :k] = np.round(100 - distances * 100, 2)
+
+    np.savez_compressed(
+        output,
+        version=np.array(store.version),
+        rows=rows,
+        temp_min=np.array(temp_min),
+        bucket_width=np.array(bucket_width),
+        crop_codes=crop_codes,
+        similarity=similarity,
+    )
+    elapsed = time.perf_counter() - start
+    print(f"🎉 Saved {output} ({os.path.getsize(output) / 1024:.1f} KB) in {elapsed:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bucket-width", type=float, default=float(os.getenv("LOCATION_RECS_BUCKET_WIDTH", "1.0")))
+    parser.add_argument("--min-temp", type=float, default=0.0)
+    parser.add_argument("--max-temp", type=float, default=50.0)
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--output", default=str(LOCATION_RECS_PATH))
+    args = parser.parse_args()
+    build(args.bucket_width, args.min_temp, args.max_temp, args.top_n, args.output)
+
+
+if __name__ == "__main__":
+    main()
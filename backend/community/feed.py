@@ -0,0 +1,130 @@
+import base64
+import os
+from datetime import datetime
+
+import humanize
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from backend.community.models import CommunityPost, Comment
+from backend.community.uploads import thumbnail_urls
+
+# ✅ Page sizes
+PAGE_SIZE = int(os.getenv("COMMUNITY_PAGE_SIZE", "20"))
+MAX_PAGE_SIZE = 100
+COMMENTS_PER_POST = int(os.getenv("COMMUNITY_COMMENTS_PER_POST", "5"))
+
+
+# ✅ Opaque keyset cursor: the (created_at, id) of the last post on the previous page
+def encode_cursor(post):
+    raw = f"{post.created_at.isoformat()}|{post.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """(created_at, id) from ``encode_cursor``; raises ValueError on anything else."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, post_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(post_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _time_ago(now, created_at):
+    return humanize.naturaltime(now - created_at) if created_at else "Just now"
+
+
+def load_recent_comments(db: Session, post_ids, per_post=COMMENTS_PER_POST):
+    """Latest ``per_post`` comments and the total count for each post, in one query.
+
+    Returns {post_id: (comments oldest first, total)}.
+    """
+    if not post_ids:
+        return {}
+
+    order = (Comment.created_at.desc(), Comment.id.desc())
+    ranked = (
+        select(
+            Comment.id.label("id"),
+            func.row_number().over(partition_by=Comment.post_id, order_by=order).label("rank"),
+            func.count().over(partition_by=Comment.post_id).label("total"),
+        )
+        .where(Comment.post_id.in_(post_ids))
+        .subquery()
+    )
+    rows = db.execute(
+        select(Comment, ranked.c.total)
+        .join(ranked, Comment.id == ranked.c.id)
+        .where(ranked.c.rank <= per_post)
+        .order_by(Comment.post_id, Comment.created_at, Comment.id)
+    ).all()
+
+    result = {post_id: ([], 0) for post_id in post_ids}
+    for comment, total in rows:
+        comments, _ = result[comment.post_id]
+        comments.append(comment)
+        result[comment.post_id] = (comments, total)
+    return result
+
+
+def load_feed_page(db: Session, cursor: str = None, limit: int = PAGE_SIZE, per_post=COMMENTS_PER_POST):
+    """One page of posts, newest first, plus the cursor of the next page (or None).
+
+    Cost depends on the page size, not on how many posts exist: the keyset
+    condition seeks into the (created_at, id) index instead of skipping rows.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    query = select(CommunityPost).order_by(CommunityPost.created_at.desc(), CommunityPost.id.desc())
+    if cursor:
+        created_at, post_id = decode_cursor(cursor)
+        # Expanded form of (created_at, id) < (:created_at, :id) that keeps a range scan on the index.
+        query = query.where(
+            CommunityPost.created_at <= created_at,
+            or_(CommunityPost.created_at < created_at,
+                and_(CommunityPost.created_at == created_at, CommunityPost.id < post_id)),
+        )
+    posts = db.scalars(query.limit(limit + 1)).all()
+
+    next_cursor = encode_cursor(posts[limit - 1]) if len(posts) > limit else None
+    return decorate_posts(db, posts[:limit], per_post), next_cursor
+
+
+def decorate_posts(db: Session, posts, per_post=COMMENTS_PER_POST):
+    """Attach what the feed template and ``serialize_post`` read to each post."""
+    now = datetime.utcnow()
+    comments = load_recent_comments(db, [post.id for post in posts], per_post)
+    for post in posts:
+        post.time_ago = _time_ago(now, post.created_at)
+        post.thumbnails = thumbnail_urls(post.image_path)
+        post.recent_comments, post.comment_count = comments[post.id]
+        for comment in post.recent_comments:
+            comment.time_ago = _time_ago(now, comment.created_at)
+    return posts
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def serialize_post(post):
+    return {
+        "id": post.id,
+        "name": post.name,
+        "title": post.title,
+        "content": post.content,
+        "category": post.category,
+        "image_path": post.image_path,
+        "thumbnails": post.thumbnails,
+        "created_at": _iso(post.created_at),
+        "comment_count": post.comment_count,
+        "comments": [
+            {
+                "id": comment.id,
+                "commenter": comment.commenter,
+                "content": comment.content,
+                "created_at": _iso(comment.created_at),
+            }
+            for comment in post.recent_comments
+        ],
+    }
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import threading
+
+from fastapi import Response
+
+from backend.services.cache import TTLCache
+
+# ✅ Rendered feed pages (HTML and JSON), keyed by page cursor.
+# Writes clear the cache; the TTL is a coarse bound for other workers' writes
+# and for the server-rendered "5 minutes ago" text (the page refreshes it client-side).
+FEED_CACHE_TTL_S = float(os.getenv("COMMUNITY_FEED_CACHE_TTL_S", "60"))
+feed_cache = TTLCache(
+    max_entries=int(os.getenv("COMMUNITY_FEED_CACHE_ENTRIES", "256")),
+    max_bytes=int(os.getenv("COMMUNITY_FEED_CACHE_MB", "32")) * 1024 * 1024,
+    ttl=FEED_CACHE_TTL_S,
+    name="community_feed",
+)
+
+_lock = threading.Lock()
+_generation = 0
+
+
+class CachedPage:
+    __slots__ = ("body", "media_type", "etag")
+
+    def __init__(self, body: bytes, media_type: str):
+        self.body = body
+        self.media_type = media_type
+        # Derived from the bytes only, so every worker hands out the same tag for the same page.
+        self.etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+
+
+def invalidate_feed():
+    """Drop every cached page; call after any write that changes the feed."""
+    global _generation
+    with _lock:
+        _generation += 1
+    feed_cache.clear()
+
+
+def feed_generation():
+    """Counter bumped by every ``invalidate_feed``; read it before querying a page."""
+    return _generation
+
+
+def cache_page(key, body: bytes, media_type: str, generation: int):
+    """Store a page rendered from data read at ``generation`` and return it as a CachedPage.
+
+    If a write landed while the page was rendering, it is returned but not cached.
+    """
+    with _lock:
+        current = _generation
+    page = CachedPage(body, media_type)
+    if generation == current:
+        feed_cache.set(key, page, size=len(body))
+    return page
+
+
+def _not_modified(request, page: CachedPage):
+    # ETag only: no Last-Modified is sent, because a per-process write clock cannot
+    # tell whether a page changed (other workers, deletes, several writes per second).
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or page.etag in tags
+
+
+def page_response(request, page: CachedPage):
+    """200 with the cached body, or an empty 304 when the client's copy is current."""
+    headers = {
+        "ETag": page.etag,
+        # Browsers keep the page but revalidate every time, so new posts show up at once.
+        "Cache-Control": "no-cache",
+    }
+    if _not_modified(request, page):
+        return Response(status_code=304, headers=headers)
+    return Response(content=page.body, media_type=page.media_type, headers=headers)
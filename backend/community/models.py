@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from backend.database.db import Base
 
@@ -17,6 +17,9 @@ class CommunityPost(Base):
     # One-to-many: one post → many comments
     comments = relationship("Comment", back_populates="post", cascade="all, delete")
 
+    # Feed pages are read newest first by (created_at, id)
+    __table_args__ = (Index("ix_community_posts_created_at_id", "created_at", "id"),)
+
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -29,3 +32,13 @@ class Comment(Base):
 
     # Many-to-one: each comment belongs to one post
     post = relationship("CommunityPost", back_populates="comments")
+
+    # Latest comments per post, without a sort, for the feed
+    __table_args__ = (Index("ix_comments_post_id_created_at_id", "post_id", "created_at", "id"),)
+
+
+def ensure_indexes(bind):
+    """Create indexes added after the tables already existed (create_all skips them)."""
+    for table in (CommunityPost.__table__, Comment.__table__):
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
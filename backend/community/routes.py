@@ -1,38 +1,97 @@
-from fastapi import APIRouter, Request, Form, UploadFile, File, Depends, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Request, Form, UploadFile, File, Depends, HTTPException, Query
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from backend.community.models import CommunityPost, Comment
-from backend.database.db import get_db
+from backend.community.feed import MAX_PAGE_SIZE, PAGE_SIZE, load_feed_page, serialize_post
+from backend.community.search import search_posts
+from backend.community.feed_cache import cache_page, feed_cache, feed_generation, invalidate_feed, page_response
+from backend.community.uploads import MAX_UPLOAD_BYTES, UploadRejected, schedule_thumbnails, store_upload
+from backend.database.db import get_async_db
 
-import os
-from uuid import uuid4
 from datetime import datetime
-import humanize
+import json
 
 router = APIRouter()
 
-UPLOAD_DIR = "static/uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
 # ✅ View Community Page
+# Handlers use async sessions, so queries and commits never block the event loop.
+# The feed query code is shared with sync callers through run_sync.
 @router.get("/community", response_class=HTMLResponse)
-def view_community(request: Request, db: Session = Depends(get_db)):
-    posts = db.query(CommunityPost).order_by(CommunityPost.created_at.desc()).all()
+async def view_community(request: Request, cursor: str = Query(None), db: AsyncSession = Depends(get_async_db)):
+    # Rendered pages are cached per cursor until the next post/comment/delete.
+    page = feed_cache.get(("html", cursor))
+    if page is None:
+        generation = feed_generation()
+        try:
+            posts, next_cursor = await db.run_sync(load_feed_page, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        rendered = request.app.templates.TemplateResponse("community.html", {
+            "request": request,
+            "posts": posts,
+            "next_cursor": next_cursor,
+            "is_first_page": cursor is None
+        })
+        page = cache_page(("html", cursor), rendered.body, "text/html; charset=utf-8", generation)
+    return page_response(request, page)
+
+
+# ✅ JSON Feed (same pages as /community)
+@router.get("/api/community/feed")
+async def community_feed(
+    request: Request,
+    cursor: str = Query(None),
+    limit: int = Query(PAGE_SIZE, ge=1),
+    db: AsyncSession = Depends(get_async_db)
+):
+    limit = min(limit, MAX_PAGE_SIZE)
+    page = feed_cache.get(("json", cursor, limit))
+    if page is None:
+        generation = feed_generation()
+        try:
+            posts, next_cursor = await db.run_sync(load_feed_page, cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    now = datetime.utcnow()
-    for post in posts:
-        if post.created_at:
-            post.time_ago = humanize.naturaltime(now - post.created_at)
-        else:
-            post.time_ago = "Just now"
+        body = json.dumps({"posts": [serialize_post(post) for post in posts], "next_cursor": next_cursor})
+        page = cache_page(("json", cursor, limit), body.encode(), "application/json", generation)
+    return page_response(request, page)
 
-        for comment in post.comments:
-            if comment.created_at:
-                comment.time_ago = humanize.naturaltime(now - comment.created_at)
-            else:
-                comment.time_ago = "Just now"
 
-    return request.app.templates.TemplateResponse("community.html", {"request": request, "posts": posts})
+# ✅ Search posts and comments (ranked; not cached, queries rarely repeat)
+@router.get("/community/search", response_class=HTMLResponse)
+async def search_community(
+    request: Request,
+    q: str = Query(""),
+    category: str = Query(None),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    posts, next_offset = await db.run_sync(search_posts, q, category or None, PAGE_SIZE, offset)
+    return request.app.templates.TemplateResponse("community.html", {
+        "request": request,
+        "posts": posts,
+        "search": {"q": q, "category": category or "", "offset": offset, "next_offset": next_offset},
+        "is_first_page": offset == 0
+    })
+
+
+@router.get("/api/community/search")
+async def search_community_json(
+    q: str = Query(..., min_length=1),
+    category: str = Query(None),
+    limit: int = Query(PAGE_SIZE, ge=1),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    posts, next_offset = await db.run_sync(search_posts, q, category, limit, offset)
+    return {
+        "posts": [{**serialize_post(post), "score": post.search_score} for post in posts],
+        "next_offset": next_offset
+    }
 
 
 # ✅ Create New Post
@@ -43,16 +102,19 @@ async def create_post(
     content: str = Form(...),
     category: str = Form(...),
     image: UploadFile = File(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     image_path = None
-    if image:
-        ext = image.filename.split(".")[-1]
-        filename = f"{uuid4()}.{ext}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        with open(file_path, "wb") as f:
-            f.write(await image.read())
-        image_path = f"/static/uploads/{filename}"
+    if image and image.filename:
+        if image.size is not None and image.size > MAX_UPLOAD_BYTES:
+            return JSONResponse({"error": "Image too large"}, status_code=413)
+        # Streamed to disk in chunks under its sha256 name; thumbnails are made in the background.
+        try:
+            _, image_path = await run_in_threadpool(store_upload, image.file, image.filename)
+        except UploadRejected as e:
+            return JSONResponse({"error": str(e)}, status_code=e.status_code)
+        # Pages cached before the thumbnails exist link the original; drop them when they land.
+        schedule_thumbnails(image_path, on_done=invalidate_feed)
 
     post = CommunityPost(
         name=name,
@@ -63,8 +125,8 @@ async def create_post(
         created_at=datetime.utcnow()  # 🔄 ensure created_at is set
     )
     db.add(post)
-    db.commit()
-    db.refresh(post)
+    await db.commit()
+    invalidate_feed()
     return RedirectResponse(url="/community", status_code=303)
 
 
@@ -74,7 +136,7 @@ async def add_comment(
     post_id: int,
     commenter: str = Form("Anonymous"),
     content: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     comment = Comment(
         post_id=post_id,
@@ -83,18 +145,20 @@ async def add_comment(
         created_at=datetime.utcnow()  # 🔄 ensure comment timestamp
     )
     db.add(comment)
-    db.commit()
-    db.refresh(comment)
+    await db.commit()
+    invalidate_feed()
     return RedirectResponse(url="/community", status_code=303)
 
 
 # ✅ Delete a Post
 @router.post("/community/delete/{post_id}")
-def delete_post(post_id: int, db: Session = Depends(get_db)):
-    post = db.query(CommunityPost).filter(CommunityPost.id == post_id).first()
+async def delete_post(post_id: int, db: AsyncSession = Depends(get_async_db)):
+    # Comments are loaded up front: the ORM cascade cannot lazy-load them in async.
+    post = await db.get(CommunityPost, post_id, options=[selectinload(CommunityPost.comments)])
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    db.delete(post)
-    db.commit()
+    await db.delete(post)
+    await db.commit()
+    invalidate_feed()
     return RedirectResponse(url="/community", status_code=303)
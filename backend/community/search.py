@@ -0,0 +1,211 @@
+import os
+import re
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from backend.community.feed import MAX_PAGE_SIZE, PAGE_SIZE, decorate_posts
+from backend.community.models import CommunityPost
+
+# ✅ Full-text index over post title/content/category and comment text, one row per post.
+# SQLite uses an FTS5 virtual table; PostgreSQL a tsvector table with a GIN index.
+# Both are kept in sync by triggers, so the ORM code that writes posts and comments is unchanged.
+SEARCH_TABLE = "community_search"
+SQLITE_TOKENIZER = os.getenv("COMMUNITY_SEARCH_TOKENIZER", "porter unicode61 remove_diacritics 2")
+POSTGRES_TS_CONFIG = os.getenv("COMMUNITY_SEARCH_TS_CONFIG", "simple")
+MAX_QUERY_TERMS = 8
+
+# bm25 column weights (title, content, category, comments); lower scores rank first
+SQLITE_WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+
+_COMMENTS_TEXT = "(SELECT group_concat(content, ' ') FROM comments WHERE post_id = {post_id})"
+
+SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE}
+        USING fts5(title, content, category, comments, tokenize='{SQLITE_TOKENIZER}')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_post_ai AFTER INSERT ON community_posts BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, title, content, category, comments)
+        VALUES (new.id, new.title, new.content, new.category, '');
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_post_au AFTER UPDATE OF title, content, category
+        ON community_posts BEGIN
+        UPDATE {SEARCH_TABLE} SET title = new.title, content = new.content, category = new.category
+        WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_post_ad AFTER DELETE ON community_posts BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_comment_ai AFTER INSERT ON comments BEGIN
+        UPDATE {SEARCH_TABLE} SET comments = {_COMMENTS_TEXT.format(post_id="new.post_id")}
+        WHERE rowid = new.post_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_comment_au AFTER UPDATE OF content ON comments BEGIN
+        UPDATE {SEARCH_TABLE} SET comments = {_COMMENTS_TEXT.format(post_id="new.post_id")}
+        WHERE rowid = new.post_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_comment_ad AFTER DELETE ON comments BEGIN
+        UPDATE {SEARCH_TABLE} SET comments = coalesce({_COMMENTS_TEXT.format(post_id="old.post_id")}, '')
+        WHERE rowid = old.post_id;
+    END""",
+]
+
+SQLITE_BACKFILL = f"""
+    INSERT INTO {SEARCH_TABLE} (rowid, title, content, category, comments)
+    SELECT p.id, p.title, p.content, p.category, coalesce({_COMMENTS_TEXT.format(post_id="p.id")}, '')
+    FROM community_posts p
+"""
+
+SQLITE_SEARCH = f"""
+    SELECT p.id, bm25({SEARCH_TABLE}, {", ".join(map(str, SQLITE_WEIGHTS))}) AS score
+    FROM {SEARCH_TABLE} JOIN community_posts p ON p.id = {SEARCH_TABLE}.rowid
+    WHERE {SEARCH_TABLE} MATCH :query {{category_filter}}
+    ORDER BY score, p.id DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+
+def _postgres_ddl(config: str):
+    # Title A, content B, category C, comments D: ts_rank weighs them 1.0 / 0.4 / 0.2 / 0.1.
+    document = f"""
+        setweight(to_tsvector('{config}', coalesce(p.title, '')), 'A') ||
+        setweight(to_tsvector('{config}', coalesce(p.content, '')), 'B') ||
+        setweight(to_tsvector('{config}', coalesce(p.category, '')), 'C') ||
+        setweight(to_tsvector('{config}', coalesce(
+            (SELECT string_agg(c.content, ' ') FROM comments c WHERE c.post_id = p.id), '')), 'D')
+    """
+    return [
+        f"""CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+            post_id integer PRIMARY KEY,
+            document tsvector NOT NULL
+        )""",
+        f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING gin (document)",
+        f"""CREATE OR REPLACE FUNCTION {SEARCH_TABLE}_refresh(pid integer) RETURNS void AS $$
+        BEGIN
+            INSERT INTO {SEARCH_TABLE} (post_id, document)
+            SELECT p.id, {document} FROM community_posts p WHERE p.id = pid
+            ON CONFLICT (post_id) DO UPDATE SET document = excluded.document;
+        END $$ LANGUAGE plpgsql""",
+        f"""CREATE OR REPLACE FUNCTION {SEARCH_TABLE}_post_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                DELETE FROM {SEARCH_TABLE} WHERE post_id = OLD.id;
+            ELSE
+                PERFORM {SEARCH_TABLE}_refresh(NEW.id);
+            END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql""",
+        f"""CREATE OR REPLACE FUNCTION {SEARCH_TABLE}_comment_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM {SEARCH_TABLE}_refresh(OLD.post_id);
+            ELSE
+                PERFORM {SEARCH_TABLE}_refresh(NEW.post_id);
+            END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql""",
+        f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_post ON community_posts",
+        f"""CREATE TRIGGER {SEARCH_TABLE}_post
+            AFTER INSERT OR DELETE OR UPDATE OF title, content, category ON community_posts
+            FOR EACH ROW EXECUTE FUNCTION {SEARCH_TABLE}_post_trigger()""",
+        f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_comment ON comments",
+        f"""CREATE TRIGGER {SEARCH_TABLE}_comment
+            AFTER INSERT OR DELETE OR UPDATE OF content ON comments
+            FOR EACH ROW EXECUTE FUNCTION {SEARCH_TABLE}_comment_trigger()""",
+    ]
+
+
+POSTGRES_BACKFILL = f"SELECT {SEARCH_TABLE}_refresh(id) FROM community_posts"
+
+POSTGRES_SEARCH = f"""
+    SELECT s.post_id, ts_rank_cd(s.document, q) AS score
+    FROM {SEARCH_TABLE} s
+    JOIN community_posts p ON p.id = s.post_id,
+    to_tsquery(CAST(:config AS regconfig), :query) q
+    WHERE s.document @@ q {{category_filter}}
+    ORDER BY score DESC, s.post_id DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+
+def _table_exists(conn, dialect: str):
+    if dialect == "sqlite":
+        sql = "SELECT 1 FROM sqlite_master WHERE name = :name"
+    else:
+        sql = "SELECT 1 FROM pg_class WHERE relname = :name"
+    return conn.execute(text(sql), {"name": SEARCH_TABLE}).first() is not None
+
+
+def ensure_search_index(conn):
+    """Create the search table and triggers on ``conn``, indexing existing posts the first time.
+
+    Runs after ``create_all`` inside the caller's transaction; safe on every startup.
+    """
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        ddl, backfill = SQLITE_DDL, SQLITE_BACKFILL
+    elif dialect == "postgresql":
+        if not re.fullmatch(r"\w+", POSTGRES_TS_CONFIG):
+            raise ValueError(f"Invalid text search config {POSTGRES_TS_CONFIG!r}")
+        ddl, backfill = _postgres_ddl(POSTGRES_TS_CONFIG), POSTGRES_BACKFILL
+    else:
+        print(f"⚠️ Community search is not supported on {dialect}")
+        return
+
+    created = not _table_exists(conn, dialect)
+    for statement in ddl:
+        conn.execute(text(statement))
+    if created:
+        conn.execute(text(backfill))
+
+
+def query_terms(query: str):
+    """Words of a user query, lower-cased; operators and punctuation are dropped."""
+    return re.findall(r"\w+", (query or "").lower())[:MAX_QUERY_TERMS]
+
+
+def match_expression(terms, dialect: str):
+    """All terms must match; the last one as a prefix, so results show up while typing."""
+    if not terms:
+        return ""
+    if dialect == "sqlite":
+        return " ".join([f'"{t}"' for t in terms[:-1]] + [f'"{terms[-1]}"*'])
+    return " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+
+
+def search_posts(db: Session, query: str, category: str = None, limit: int = PAGE_SIZE, offset: int = 0):
+    """Best-matching posts for ``query`` plus the offset of the next page (or None).
+
+    Posts come back decorated like feed posts, each with a ``search_score``.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    offset = max(0, int(offset))
+    terms = query_terms(query)
+    if not terms:
+        return [], None
+
+    dialect = db.get_bind().dialect.name
+    params = {"query": match_expression(terms, dialect), "limit": limit + 1, "offset": offset}
+    category_filter = ""
+    if category:
+        category_filter = "AND p.category = :category"
+        params["category"] = category
+    if dialect == "postgresql":
+        sql = POSTGRES_SEARCH
+        params["config"] = POSTGRES_TS_CONFIG
+    else:
+        sql = SQLITE_SEARCH
+
+    rows = db.execute(text(sql.format(category_filter=category_filter)), params).all()
+    next_offset = offset + limit if len(rows) > limit else None
+    rows = rows[:limit]
+
+    by_id = {post.id: post for post in db.scalars(
+        select(CommunityPost).where(CommunityPost.id.in_([row[0] for row in rows]))
+    )}
+    posts = []
+    for post_id, score in rows:
+        post = by_id.get(post_id)
+        if post is not None:
+            post.search_score = float(score)
+            posts.append(post)
+    return decorate_posts(db, posts), next_offset
@@ -0,0 +1,198 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from uuid import uuid4
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from PIL import Image, ImageOps
+from starlette.datastructures import Headers
+
+# ✅ Storage: originals are named by content hash, so the same image is stored once
+UPLOAD_DIR = Path("static/uploads")
+THUMB_DIR = UPLOAD_DIR / "thumbs"
+UPLOAD_URL = "/static/uploads"
+os.makedirs(THUMB_DIR, exist_ok=True)
+
+MAX_UPLOAD_BYTES = int(float(os.getenv("COMMUNITY_MAX_UPLOAD_MB", "10")) * 1024 * 1024)
+CHUNK_SIZE = 1024 * 1024
+IMAGE_EXTENSIONS = {"jpg", "jpeg", "png", "webp", "gif", "bmp"}
+# Pillow format -> stored extension; the bytes decide, not the uploaded filename
+IMAGE_FORMATS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif", "BMP": "bmp"}
+# Multipart framing and the text fields that travel with the image
+FORM_OVERHEAD_BYTES = 256 * 1024
+
+# ✅ Thumbnails: one WebP and one JPEG per width
+THUMBNAIL_WIDTHS = [int(w) for w in os.getenv("COMMUNITY_THUMBNAIL_WIDTHS", "320,640").split(",")]
+THUMBNAIL_FORMATS = {"webp": ("WEBP", {"quality": 80, "method": 4}),
+                     "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True})}
+thumbnail_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("THUMBNAIL_WORKERS", "2")), thread_name_prefix="thumbnails"
+)
+
+
+class UploadRejected(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _too_large(max_bytes: int):
+    return f"Image larger than {max_bytes // (1024 * 1024)} MB"
+
+
+class UploadSizeLimit:
+    """ASGI middleware capping request bodies on ``paths`` before they are parsed.
+
+    Starlette spools the whole multipart body before a handler runs, so the
+    check in ``store_upload`` alone would come after the bytes were received.
+    A Content-Length over the limit gets a 413 without reading the body;
+    chunked bodies are counted as they stream in and cut off at the limit.
+    """
+
+    def __init__(self, app, paths, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+        self.limit = max_bytes + FORM_OVERHEAD_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        length = Headers(scope=scope).get("content-length", "")
+        if length.isdigit() and int(length) > self.limit:
+            response = JSONResponse({"error": _too_large(self.max_bytes)}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    # Raised inside form parsing; FastAPI passes HTTPException through.
+                    raise HTTPException(status_code=413, detail=_too_large(self.max_bytes))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _extension(filename: str):
+    ext = Path(filename or "").suffix.lower().lstrip(".")
+    if ext not in IMAGE_EXTENSIONS:
+        raise UploadRejected(f"Unsupported image type {ext or '(none)'!r}", status_code=415)
+    return "jpg" if ext == "jpeg" else ext
+
+
+def _verified_extension(path: Path):
+    try:
+        with Image.open(path) as image:
+            image.verify()
+            fmt = image.format
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        raise UploadRejected("Not a valid image", status_code=415)
+    if fmt not in IMAGE_FORMATS:
+        raise UploadRejected(f"Unsupported image format {fmt}", status_code=415)
+    return IMAGE_FORMATS[fmt]
+
+
+def store_upload(source, filename: str, max_bytes: int = MAX_UPLOAD_BYTES):
+    """Copy a file object to UPLOAD_DIR in chunks, hashing as it goes.
+
+    Blocking; call it from a worker thread. Returns (digest, public URL).
+    Raises UploadRejected (413) once more than ``max_bytes`` have been read,
+    and (415) if the bytes are not an image Pillow can read.
+    """
+    _extension(filename)  # cheap early reject; the stored extension comes from the bytes
+    digest = hashlib.sha256()
+    tmp = UPLOAD_DIR / f".{uuid4().hex}.tmp"
+    size = 0
+    try:
+        with open(tmp, "wb") as out:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(_too_large(max_bytes), status_code=413)
+                digest.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise UploadRejected("Empty image upload")
+        # Checked before the file gets its content-addressed name, not later in the thumbnail job.
+        ext = _verified_extension(tmp)
+
+        name = f"{digest.hexdigest()}.{ext}"
+        target = UPLOAD_DIR / name
+        if target.exists():
+            tmp.unlink()
+        else:
+            os.replace(tmp, target)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return digest.hexdigest(), f"{UPLOAD_URL}/{name}"
+
+
+def _thumb_name(digest: str, width: int, fmt: str):
+    return f"{digest}_{width}.{fmt}"
+
+
+def make_thumbnails(path: Path, digest: str):
+    """Write every missing thumbnail width/format of ``path``; safe to run twice."""
+    missing = [(w, fmt) for w in THUMBNAIL_WIDTHS for fmt in THUMBNAIL_FORMATS
+               if not (THUMB_DIR / _thumb_name(digest, w, fmt)).exists()]
+    if not missing:
+        return
+
+    with Image.open(path) as image:
+        # JPEG DCT scaling: decode near the largest thumbnail instead of full size.
+        image.draft("RGB", (max(THUMBNAIL_WIDTHS), max(THUMBNAIL_WIDTHS)))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+
+    for width, fmt in missing:
+        thumb = image
+        if image.width > width:
+            thumb = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        pil_format, options = THUMBNAIL_FORMATS[fmt]
+        target = THUMB_DIR / _thumb_name(digest, width, fmt)
+        tmp = THUMB_DIR / f".{uuid4().hex}.{fmt}"
+        thumb.save(tmp, pil_format, **options)
+        os.replace(tmp, target)
+
+
+def schedule_thumbnails(image_url: str, on_done=None):
+    """Queue thumbnail generation for an uploaded image on the background pool.
+
+    ``on_done()`` is called from the pool thread once the thumbnails are written.
+    """
+    name = image_url.rsplit("/", 1)[-1]
+    digest = name.split(".", 1)[0]
+
+    def finished(future):
+        if future.exception() is not None:
+            print("⚠️ Thumbnail generation failed:", future.exception())
+        elif on_done is not None:
+            on_done()
+
+    thumbnail_pool.submit(make_thumbnails, UPLOAD_DIR / name, digest).add_done_callback(finished)
+
+
+def thumbnail_urls(image_url: str):
+    """{"webp": {width: url}, "jpg": {width: url}} once thumbnails exist, else None.
+
+    Older uploads and images still being processed fall back to the original.
+    """
+    if not image_url or not image_url.startswith(UPLOAD_URL + "/"):
+        return None
+    digest = image_url.rsplit("/", 1)[-1].split(".", 1)[0]
+    if not (THUMB_DIR / _thumb_name(digest, THUMBNAIL_WIDTHS[-1], "jpg")).exists():
+        return None
+    return {
+        fmt: {w: f"{UPLOAD_URL}/thumbs/{_thumb_name(digest, w, fmt)}" for w in THUMBNAIL_WIDTHS}
+        for fmt in THUMBNAIL_FORMATS
+    }
@@ -0,0 +1,64 @@
+import hashlib
+
+from PIL import Image
+
+from backend.services.cache import TTLCache
+
+
+def content_hash(contents: bytes):
+    """Exact key for an upload: SHA-256 of the raw bytes, taken before decoding."""
+    return hashlib.sha256(contents).hexdigest()
+
+
+def perceptual_hash(image: Image.Image, hash_size: int = 8):
+    """64-bit difference hash (dHash) of a decoded image.
+
+    Re-encoded copies of the same photo (WhatsApp forwards, re-saves) differ in
+    bytes but share a dHash, so they skip the forward pass too.
+    """
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+class DiseasePredictionCache:
+    """Two-level LRU cache of predicted labels, keyed on the serving model version.
+
+    Level 1 maps upload bytes → label and is checked before decoding; level 2
+    maps the perceptual hash of the decoded image → label and is checked before
+    the CNN forward pass.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.exact = TTLCache(max_entries=max_entries, name="disease_exact")
+        self.perceptual = TTLCache(max_entries=max_entries, name="disease_perceptual")
+
+    def bind_version(self, model_version: str):
+        """Drop both levels when the serving model changes."""
+        self.exact.bind_version(model_version)
+        self.perceptual.bind_version(model_version)
+
+    def get_exact(self, digest: str):
+        return self.exact.get(digest)
+
+    def get_perceptual(self, phash: int):
+        return self.perceptual.get(phash)
+
+    def put(self, digest: str, phash: int, label: str):
+        self.exact.set(digest, label)
+        if phash is not None:
+            self.perceptual.set(phash, label)
+
+    def stats(self):
+        exact, perceptual = self.exact.stats(), self.perceptual.stats()
+        uploads = exact["hits"] + exact["misses"]
+        return {
+            "exact": exact,
+            "perceptual": perceptual,
+            "overall_hit_rate": round((exact["hits"] + perceptual["hits"]) / uploads, 4) if uploads else 0.0,
+        }
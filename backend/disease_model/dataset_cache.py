@@ -0,0 +1,226 @@
+"""Pre-decoded, memory-mapped copy of dataset/ for training.
+
+Every image is decoded once, resized to IMAGE_SIZE and appended as a uint8
+HWC array to one flat ``images.u8`` file. ``labels.npy`` and ``manifest.json``
+sit next to it. Re-running the build only decodes files that are new since the
+last run; a removed or modified file triggers a full rebuild.
+
+    python -m backend.disease_model.dataset_cache --data-dir dataset --workers 8
+"""
+import argparse
+import json
+import os
+import time
+from multiprocessing import Pool
+from pathlib import Path
+
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import Dataset
+
+from backend.disease_model.preprocess import IMAGE_SIZE, decode_image
+
+CACHE_DIR = Path(os.getenv("DISEASE_DATASET_CACHE", "dataset_cache"))
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+CACHE_VERSION = 1
+
+IMAGES_FILE = "images.u8"
+LABELS_FILE = "labels.npy"
+MANIFEST_FILE = "manifest.json"
+
+
+def _image_shape(size=IMAGE_SIZE):
+    width, height = size
+    return (height, width, 3)
+
+
+def scan_dataset(data_dir: Path):
+    """Class names in ImageFolder order and ``{relative_path: (class, size, mtime)}``."""
+    classes = sorted(p.name for p in data_dir.iterdir() if p.is_dir())
+    files = {}
+    for name in classes:
+        for f in sorted((data_dir / name).iterdir()):
+            if f.suffix.lower() in IMAGE_EXTENSIONS:
+                st = f.stat()
+                files[f"{name}/{f.name}"] = (name, st.st_size, int(st.st_mtime))
+    return classes, files
+
+
+def _decode(path):
+    image = decode_image(path)
+    if image.size != IMAGE_SIZE:
+        image = image.resize(IMAGE_SIZE, Image.BILINEAR)
+    return np.asarray(image, dtype=np.uint8)
+
+
+def read_manifest(cache_dir: Path):
+    path = cache_dir / MANIFEST_FILE
+    if not path.exists():
+        return None
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("cache_version") != CACHE_VERSION or manifest.get("image_size") != list(IMAGE_SIZE):
+        return None
+    return manifest
+
+
+def _replace(path: Path, write, binary: bool = False):
+    """Write ``path`` through a temporary file so readers never see a partial one."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb" if binary else "w") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def build_cache(data_dir, cache_dir=CACHE_DIR, workers: int = os.cpu_count() or 1, rebuild: bool = False):
+    """Create or extend the cache. Returns the manifest that was written."""
+    data_dir, cache_dir = Path(data_dir), Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    classes, files = scan_dataset(data_dir)
+    image_bytes = int(np.prod(_image_shape()))
+
+    manifest = None if rebuild else read_manifest(cache_dir)
+    if manifest is not None:
+        stale = [p for p, stamp in manifest["files"].items() if tuple(files.get(p, ())) != tuple(stamp)]
+        if stale:
+            print(f"⚠️ {len(stale)} cached images were removed or modified — rebuilding from scratch.")
+            manifest = None
+
+    if manifest is None:
+        old_classes, cached, order = classes, {}, []
+        labels = np.empty(0, dtype=np.int64)
+    else:
+        old_classes, cached, order = manifest["classes"], manifest["files"], manifest["order"]
+        # Like images.u8, labels.npy may run past the manifest after an interrupted build.
+        labels = np.load(cache_dir / LABELS_FILE)[:len(order)]
+        # New class folders shift ImageFolder indices; remap the stored labels.
+        remap = np.array([classes.index(name) for name in old_classes], dtype=np.int64)
+        labels = remap[labels]
+
+    new_paths = [p for p in files if p not in cached]
+    images_path = cache_dir / IMAGES_FILE
+    start = time.perf_counter()
+
+    # The manifest count is authoritative: drop any tail left by an interrupted append.
+    with open(images_path, "r+b" if manifest is not None and images_path.exists() else "wb") as out:
+        out.truncate(len(order) * image_bytes)
+        out.seek(0, os.SEEK_END)
+        if new_paths:
+            with Pool(max(1, workers)) as pool:
+                decoded = pool.imap(_decode, [data_dir / p for p in new_paths], chunksize=32)
+                for i, pixels in enumerate(decoded, 1):
+                    out.write(pixels.tobytes())
+                    if i % 1000 == 0:
+                        print(f"  ✅ {i}/{len(new_paths)} images decoded")
+
+    labels = np.concatenate([labels, np.array([classes.index(files[p][0]) for p in new_paths], dtype=np.int64)])
+    order = order + new_paths
+    # labels.npy and then the manifest are swapped in only once every image is on disk.
+    _replace(cache_dir / LABELS_FILE, lambda f: np.save(f, labels), binary=True)
+
+    manifest = {
+        "cache_version": CACHE_VERSION,
+        "image_size": list(IMAGE_SIZE),
+        "count": len(order),
+        "classes": classes,
+        "order": order,
+        "files": {p: list(files[p]) for p in order},
+    }
+    _replace(cache_dir / MANIFEST_FILE, lambda f: json.dump(manifest, f))
+
+    elapsed = time.perf_counter() - start
+    rate = len(new_paths) / elapsed if elapsed > 0 else 0.0
+    print(f"🎉 Cache at {cache_dir}: {len(order)} images ({len(new_paths)} new, {rate:.0f} img/s), "
+          f"{images_path.stat().st_size / 1e9:.2f} GB")
+    return manifest
+
+
+def to_float_batch(images: torch.Tensor):
+    """uint8 NHWC batch -> float32 NCHW in [0, 1], same values as ``ToTensor()``.
+
+    The permute is a view, so the result is already in ``channels_last`` layout.
+    """
+    return images.permute(0, 3, 1, 2).float().div_(255)
+
+
+class MemmapImageDataset(Dataset):
+    """Read-only view over a cache written by ``build_cache``.
+
+    Items are ``(uint8 HWC tensor, label)``. ``__getitems__`` gathers a whole
+    batch with a single fancy index into the memmap, so pair it with
+    ``collate_fn=collate_batch``. The memmap is opened lazily per process,
+    which keeps the dataset cheap to send to DataLoader workers.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, indices=None):
+        self.cache_dir = Path(cache_dir)
+        manifest = read_manifest(self.cache_dir)
+        if manifest is None:
+            raise FileNotFoundError(f"No dataset cache at {self.cache_dir}; run python -m backend.disease_model.dataset_cache")
+        self.classes = manifest["classes"]
+        self.class_to_idx = {name: i for i, name in enumerate(self.classes)}
+        self.count = manifest["count"]
+        self.labels = np.load(self.cache_dir / LABELS_FILE)[:self.count]
+        self.indices = np.arange(self.count) if indices is None else np.asarray(indices, dtype=np.int64)
+        self._images = None
+
+    @property
+    def images(self):
+        if self._images is None:
+            self._images = np.memmap(self.cache_dir / IMAGES_FILE, dtype=np.uint8, mode="r",
+                                     shape=(self.count, *_image_shape()))
+        return self._images
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_images"] = None
+        return state
+
+    def subset(self, indices):
+        """A dataset over ``indices`` of this one (e.g. a train/val split)."""
+        child = MemmapImageDataset.__new__(MemmapImageDataset)
+        child.__dict__.update(self.__getstate__())
+        child.indices = self.indices[np.asarray(indices, dtype=np.int64)]
+        return child
+
+    @property
+    def targets(self):
+        return self.labels[self.indices]
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        row = self.indices[i]
+        return torch.from_numpy(np.array(self.images[row])), int(self.labels[row])
+
+    def __getitems__(self, batch_indices):
+        rows = self.indices[np.asarray(batch_indices, dtype=np.int64)]
+        return torch.from_numpy(np.asarray(self.images[rows])), torch.from_numpy(self.labels[rows])
+
+    def slice(self, start: int, stop: int):
+        """Contiguous rows ``start:stop`` of the cache as a zero-copy uint8 view."""
+        return self.images[start:stop], self.labels[start:stop]
+
+
+def collate_batch(batch):
+    """``collate_fn`` for MemmapImageDataset: batches arrive already stacked."""
+    if isinstance(batch, tuple):
+        return batch
+    images, labels = zip(*batch)
+    return torch.stack(images), torch.tensor(labels)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", default="dataset")
+    parser.add_argument("--cache-dir", default=str(CACHE_DIR))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rebuild", action="store_true", help="ignore the existing cache")
+    args = parser.parse_args()
+    build_cache(args.data_dir, args.cache_dir, args.workers, args.rebuild)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Export an int8 dynamically quantized, conv/ReLU-fused, scripted and frozen PlantDiseaseModel.
+
+    python -m backend.disease_model.export_quantized            # export only
+    python -m backend.disease_model.export_quantized --parity   # export + parity check over dataset/
+
+The parity check runs the fp32 and int8 models over every class folder in
+dataset/ and reports top-1 agreement, accuracy against the folder label,
+per-image latency and model file size.
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+
+from backend.disease_model.model import MODEL_DIR, MODEL_PATHS, PlantDiseaseModel, load_model
+from backend.disease_model.preprocess import load_image_tensor
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+
+def unfused_conv_relu(graph):
+    """Number of ReLU nodes in ``graph`` that still read a separate conv2d output."""
+    count = 0
+    for node in graph.nodes():
+        if node.kind() in ("aten::relu", "aten::relu_"):
+            if next(node.inputs()).node().kind() in ("aten::conv2d", "aten::_convolution"):
+                count += 1
+    return count
+
+
+def export(num_classes: int):
+    model = load_model("fp32", num_classes=num_classes)
+
+    # Pair each conv with its ReLU (ConvReLU2d) so the graph exposes them as units.
+    model = torch.ao.quantization.fuse_modules(model, PlantDiseaseModel.FUSE_PAIRS)
+    # Nearly all weights sit in the Linear head, so dynamic int8 quantization of
+    # Linear layers covers the bulk of the memory traffic per inference.
+    quantized = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    scripted = torch.jit.script(quantized)
+    # Freezing inlines weights and folds constants. It does not fuse conv + ReLU
+    # kernels; load_model("int8") does that with optimize_for_inference.
+    frozen = torch.jit.freeze(scripted.eval())
+
+    optimized = torch.jit.optimize_for_inference(scripted)
+    remaining = unfused_conv_relu(optimized.graph)
+    print(f"{'✅' if remaining == 0 else '⚠️'} conv + ReLU pairs left unfused after "
+          f"optimize_for_inference: {remaining} (frozen graph: {unfused_conv_relu(frozen.graph)})")
+
+    output = MODEL_PATHS["int8"]
+    torch.jit.save(frozen, str(output))
+    print(f"🎉 Saved int8 model to {output} ({output.stat().st_size / 1e6:.2f} MB)")
+
+
+def _dataset_images(data_dir: Path, per_class: int):
+    for class_dir in sorted(p for p in data_dir.iterdir() if p.is_dir()):
+        files = sorted(f for f in class_dir.iterdir() if f.suffix.lower() in IMAGE_EXTENSIONS)
+        for f in files[:per_class] if per_class else files:
+            yield class_dir.name, f
+
+
+def parity(data_dir: Path, class_labels: dict, per_class: int, batch_size: int):
+    models = {variant: load_model(variant, num_classes=len(class_labels)) for variant in ("fp32", "int8")}
+    label_to_idx = {name: int(idx) for idx, name in class_labels.items()}
+
+    samples = list(_dataset_images(data_dir, per_class))
+    predictions = {variant: [] for variant in models}
+    seconds = {variant: 0.0 for variant in models}
+
+    for start in range(0, len(samples), batch_size):
+        chunk = samples[start:start + batch_size]
+        batch = torch.stack([load_image_tensor(path) for _, path in chunk])
+        for variant, model in models.items():
+            began = time.perf_counter()
+            with torch.no_grad():
+                output = model(batch)
+            seconds[variant] += time.perf_counter() - began
+            predictions[variant].extend(torch.argmax(output, dim=1).tolist())
+
+    # Request-style latency: one image per forward pass.
+    single = [load_image_tensor(path).unsqueeze(0) for _, path in samples[:50]]
+    single_ms = {}
+    for variant, model in models.items():
+        began = time.perf_counter()
+        with torch.no_grad():
+            for img_tensor in single:
+                model(img_tensor)
+        single_ms[variant] = (time.perf_counter() - began) * 1000 / max(1, len(single))
+
+    truth = [label_to_idx.get(name, -1) for name, _ in samples]
+    n = len(samples)
+    report = {
+        "images": n,
+        "per_class_limit": per_class,
+        "batch_size": batch_size,
+        "top1_agreement": round(sum(a == b for a, b in zip(predictions["fp32"], predictions["int8"])) / n, 4),
+    }
+    for variant in models:
+        report[variant] = {
+            "accuracy": round(sum(p == t for p, t in zip(predictions[variant], truth)) / n, 4),
+            "batched_ms_per_image": round(seconds[variant] * 1000 / n, 3),
+            "single_image_ms": round(single_ms[variant], 3),
+            "file_mb": round(MODEL_PATHS[variant].stat().st_size / 1e6, 2),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parity", action="store_true", help="compare against fp32 over dataset/")
+    parser.add_argument("--data-dir", default="dataset")
+    parser.add_argument("--per-class", type=int, default=0, help="images per class for --parity (0 = all)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    with open(MODEL_DIR / "class_labels.json") as f:
+        class_labels = json.load(f)
+
+    export(num_classes=len(class_labels))
+
+    if args.parity:
+        report = parity(Path(args.data_dir), class_labels, args.per_class, args.batch_size)
+        report_path = MODEL_DIR / "quantization_report.json"
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(json.dumps(report, indent=2))
+        print(f"✅ Report saved to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import hashlib
+import torch
+import torch.nn as nn
+from pathlib import Path
+
+MODEL_DIR = Path(__file__).parent
+
+# 👇 Serving variants: the trained fp32 weights and the int8 TorchScript export
+MODEL_PATHS = {
+    "fp32": MODEL_DIR / "plant_disease_model.pt",
+    "int8": MODEL_DIR / "plant_disease_model_int8.pt",
+}
+
+
+# 👇 Model architecture used in training
+class PlantDiseaseModel(nn.Module):
+    def __init__(self, num_classes=38):
+        super(PlantDiseaseModel, self).__init__()
+        self.conv = nn.Sequential(
+            nn.Conv2d(3, 16, kernel_size=3, padding=1),
+            nn.ReLU(),
+            nn.MaxPool2d(2),
+            nn.Conv2d(16, 32, kernel_size=3, padding=1),
+            nn.ReLU(),
+            nn.MaxPool2d(2)
+        )
+        self.fc = nn.Linear(32 * 56 * 56, num_classes)  # ✅ Not a Sequential
+
+    # 👇 (conv, ReLU) module pairs in ``self.conv`` for torch.ao.quantization.fuse_modules
+    FUSE_PAIRS = [["conv.0", "conv.1"], ["conv.3", "conv.4"]]
+
+    def forward(self, x):
+        x = self.conv(x)
+        x = torch.flatten(x, 1)  # Flatten (works for channels_last inputs too)
+        x = self.fc(x)
+        return x
+
+
+def load_model(variant: str = "fp32", num_classes: int = 15):
+    """Load a serving variant in eval mode on CPU.
+
+    ``fp32`` is the trained state dict; ``int8`` is the frozen TorchScript module
+    written by ``python -m backend.disease_model.export_quantized``.
+    """
+    if variant not in MODEL_PATHS:
+        raise ValueError(f"Unknown model variant {variant!r}, expected one of {list(MODEL_PATHS)}")
+
+    path = MODEL_PATHS[variant]
+    if variant == "int8":
+        model = torch.jit.load(str(path), map_location="cpu")
+        try:
+            # Rewrites conv + ReLU into single fused (MKLDNN) convolutions. Done at load
+            # time because the prepacked ops it produces are not guaranteed to serialize.
+            return torch.jit.optimize_for_inference(model)
+        except Exception as e:
+            print("⚠️ optimize_for_inference failed, serving the frozen graph as is:", e)
+    else:
+        model = PlantDiseaseModel(num_classes=num_classes)
+        model.load_state_dict(torch.load(path, map_location=torch.device("cpu")))
+    model.eval()
+    return model
+
+
+def model_version(variant: str = "fp32"):
+    """Variant plus a digest of the weights file, so caches reset when weights change."""
+    digest = hashlib.sha1()
+    with open(MODEL_PATHS[variant], "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return f"{variant}:{digest.hexdigest()[:12]}"
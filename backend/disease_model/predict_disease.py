@@ -1,85 +1,144 @@
 from fastapi import APIRouter, UploadFile, File
+from fastapi.responses import JSONResponse
 from PIL import Image
-import torch
-import torch.nn as nn
-import torchvision.transforms as transforms
+from io import BytesIO
+from types import SimpleNamespace
 import json
 from pathlib import Path
-import gdown
 import os
 
-MODEL_PATH = "backend/disease_model/plant_disease_model.pt"
-
-if not os.path.exists(MODEL_PATH):
-    print("Downloading model...")
-    url = "https://drive.google.com/uc?id=YOUR_FILE_ID"
-    gdown.download(url, MODEL_PATH, quiet=False)
-
+from backend.disease_model.cache import DiseasePredictionCache, content_hash, perceptual_hash
+from backend.disease_model.preprocess import decode_image, image_to_tensor
+from backend.services.batching import MicroBatcher
+from backend.services.executor import BoundedExecutor, ExecutorBusy
+from backend.services.resources import LazyResource
 
+MODEL_PATH = "backend/disease_model/plant_disease_model.pt"
+MODEL_URL = os.getenv("DISEASE_MODEL_URL", "https://drive.google.com/uc?id=YOUR_FILE_ID")
 
 router = APIRouter()
 
-# 👇 1. Define the model architecture used in training
-class PlantDiseaseModel(nn.Module):
-    def __init__(self, num_classes=38):
-        super(PlantDiseaseModel, self).__init__()
-        self.conv = nn.Sequential(
-            nn.Conv2d(3, 16, kernel_size=3, padding=1),
-            nn.ReLU(),
-            nn.MaxPool2d(2),
-            nn.Conv2d(16, 32, kernel_size=3, padding=1),
-            nn.ReLU(),
-            nn.MaxPool2d(2)
-        )
-        self.fc = nn.Linear(32 * 56 * 56, num_classes)  # ✅ Not a Sequential
-
-    def forward(self, x):
-        x = self.conv(x)
-        x = x.view(x.size(0), -1)  # Flatten
-        x = self.fc(x)
-        return x
-
-# 👇 2. Load model with weights
-model_path = Path(__file__).parent / "plant_disease_model.pt"
-model = PlantDiseaseModel(num_classes=15)  # Set your actual number of classes
-model.load_state_dict(torch.load(model_path, map_location=torch.device('cpu')))
-model.eval()
-
-# 👇 3. Load class labels
+# 👇 1. Load class labels
 labels_path = Path(__file__).parent / "class_labels.json"
 with open(labels_path) as f:
     class_labels = json.load(f)
 
-# 👇 4. Image transform
-transform = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor()
-])
+# 👇 2. Model with weights, loaded on first use (DISEASE_MODEL_VARIANT=int8 serves the quantized export)
+# torch is only imported here, so importing the app stays cheap.
+MODEL_VARIANT = os.getenv("DISEASE_MODEL_VARIANT", "fp32")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+
+def _load_disease_model():
+    import torch
+    from backend.disease_model.model import load_model, model_version
+
+    if MODEL_VARIANT == "fp32" and not os.path.exists(MODEL_PATH):
+        import gdown
+
+        print("Downloading model...")
+        gdown.download(MODEL_URL, MODEL_PATH, quiet=False)
+
+    # Forward passes are serialized by the batcher, so torch gets every core but
+    # one by default; the spare core keeps the event loop responsive.
+    torch.set_num_threads(int(os.getenv("TORCH_NUM_THREADS", str(max(1, (os.cpu_count() or 2) - 1)))))
+
+    loaded = SimpleNamespace(
+        model=load_model(MODEL_VARIANT, num_classes=len(class_labels)),
+        version=model_version(MODEL_VARIANT),
+    )
+    print(f"✅ Loaded disease model ({loaded.version})")
+    return loaded
+
+disease_model_resource = LazyResource("disease_model", _load_disease_model)
+
+# 👇 3. Image preprocessing lives in preprocess.py (reduced-resolution decode)
+
+# 👇 4. Dedicated executor for decode + inference, off the event loop
+disease_executor = BoundedExecutor(
+    max_workers=INFERENCE_WORKERS,
+    max_pending=int(os.getenv("INFERENCE_MAX_PENDING", "32")),
+    name="disease",
+)
 
-# 👇 5. Prediction endpoint
+# 👇 5. Batched inference shared by /predict-disease and /detect_disease
+def predict_batch(img_tensors):
+    import torch
+
+    model = disease_model_resource.get().model
+    batch = torch.stack(img_tensors)
+
+    with torch.no_grad():
+        output = model(batch)
+        predicted = torch.argmax(output, dim=1).tolist()
+
+    return [class_labels[str(idx)] for idx in predicted]
+
+disease_batcher = MicroBatcher(
+    predict_batch,
+    max_batch_size=int(os.getenv("DISEASE_MAX_BATCH", "16")),
+    max_wait_ms=float(os.getenv("DISEASE_MAX_WAIT_MS", "5")),
+    executor=disease_executor.pool,
+    name="disease",
+)
+
+# 👇 6. Two-level result cache: upload bytes, then perceptual hash of the decoded image
+disease_cache = DiseasePredictionCache(max_entries=int(os.getenv("DISEASE_CACHE_MAX_ENTRIES", "4096")))
+
+def decode_for_inference(contents: bytes):
+    image = decode_image(BytesIO(contents))
+    return image_to_tensor(image), perceptual_hash(image)
+
+async def classify_upload(contents: bytes):
+    """Classify an upload, reusing cached labels for repeated or re-encoded photos.
+
+    Model loading, hashing, decoding and the forward pass all run on the
+    inference pool. Raises ExecutorBusy when too many disease requests are
+    already in flight.
+    """
+    async with disease_executor.admit():
+        if disease_model_resource.loaded:
+            loaded = disease_model_resource.get()
+        else:
+            loaded = await disease_executor.run(disease_model_resource.get)
+        disease_cache.bind_version(loaded.version)
+
+        digest = await disease_executor.run(content_hash, contents)
+        label = disease_cache.get_exact(digest)
+        if label is not None:
+            return label
+
+        img_tensor, phash = await disease_executor.run(decode_for_inference, contents)
+        label = disease_cache.get_perceptual(phash)
+        if label is None:
+            label = await disease_batcher.submit(img_tensor)
+        disease_cache.put(digest, phash, label)
+        return label
+
+def busy_response(e: ExecutorBusy):
+    return JSONResponse({"error": str(e)}, status_code=503, headers={"Retry-After": "1"})
+
+def warmup():
+    """Load the model and run one dummy forward pass so the first request is not slow."""
+    import torch
+
+    model = disease_model_resource.get().model
+    with torch.no_grad():
+        model(torch.zeros(1, 3, 224, 224))
+
+
+# 👇 7. Prediction endpoint
 @router.post("/predict-disease")
 async def predict_disease(file: UploadFile = File(...)):
     try:
-        image = Image.open(file.file).convert("RGB")
-        img_tensor = transform(image).unsqueeze(0)
-
-        with torch.no_grad():
-            output = model(img_tensor)
-            predicted_idx = torch.argmax(output, dim=1).item()
-            predicted_class = class_labels[str(predicted_idx)]
+        contents = await file.read()
+        predicted_class = await classify_upload(contents)
 
         return {"predicted_disease": predicted_class}
+    except ExecutorBusy as e:
+        return busy_response(e)
     except Exception as e:
         return {"error": str(e)}
 
 
 def predict_image(image: Image.Image):
-    img_tensor = transform(image).unsqueeze(0)
-
-    with torch.no_grad():
-        output = model(img_tensor)
-        predicted_idx = torch.argmax(output, dim=1).item()
-        predicted_class = class_labels[str(predicted_idx)]
-
-    return predicted_class
-
+    return predict_batch([image_to_tensor(image)])[0]
@@ -0,0 +1,51 @@
+import numpy as np
+from PIL import Image
+
+# 👇 Model input size (width, height)
+IMAGE_SIZE = (224, 224)
+
+# 👇 Modes Image.reduce supports; anything else is converted before shrinking
+REDUCIBLE_MODES = {"L", "RGB", "RGBA"}
+
+
+def decode_image(source, size=IMAGE_SIZE):
+    """Open an image and decode it close to ``size`` instead of at full resolution.
+
+    JPEGs use libjpeg DCT scaling via ``draft`` (1/2, 1/4 or 1/8 while staying at
+    least ``size``), so a 12 MP phone photo is never fully decoded. Other formats
+    are decoded and then shrunk with ``reduce`` by an integer factor; modes that
+    ``reduce`` cannot handle (palette, 1-bit, 16/32-bit) are converted to RGB first.
+    """
+    image = Image.open(source)
+    if image.format == "JPEG":
+        image.draft("RGB", size)
+    else:
+        if image.mode not in REDUCIBLE_MODES:
+            image = image.convert("RGB")
+        factor = min(image.width // size[0], image.height // size[1])
+        if factor >= 2:
+            image = image.reduce(factor)
+    return image.convert("RGB")
+
+
+def image_to_tensor(image: Image.Image, size=IMAGE_SIZE):
+    """Resize to ``size`` and return a CHW float32 tensor scaled to [0, 1].
+
+    Same output as ``Resize(size)`` + ``ToTensor()``: pixels go straight into a
+    float32 array that is scaled in place and wrapped by torch without a copy.
+    """
+    import torch
+
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    if image.size != size:
+        image = image.resize(size, Image.BILINEAR)
+
+    pixels = np.asarray(image, dtype=np.float32)
+    pixels *= 1 / 255
+    return torch.from_numpy(pixels).permute(2, 0, 1)
+
+
+def load_image_tensor(source):
+    """Decode ``source`` (path or file-like) into a model-ready tensor."""
+    return image_to_tensor(decode_image(source))
@@ -1,102 +1,250 @@
-# backend/disease_model/train_disease_model.py
+"""Train PlantDiseaseModel on dataset/{class_name}/*.jpg.
+
+    python -m backend.disease_model.dataset_cache                 # optional, once
+    python -m backend.disease_model.train_disease_model --epochs 20 --workers 4
+
+Reads the memory-mapped cache from dataset_cache.py when it exists, otherwise
+decodes dataset/ on the fly. A checkpoint is written after every epoch and
+picked up again on the next run, so an interrupted run continues where it
+stopped. Training ends at --epochs or when validation loss has not improved
+for --patience epochs; the best weights are saved once at the end.
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
 
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torchvision import datasets, transforms
-from torch.utils.data import DataLoader
-import os
-import time
-import json
-
-# Define the model
-class PlantDiseaseModel(nn.Module):
-    def __init__(self, num_classes=38):
-        super(PlantDiseaseModel, self).__init__()
-        self.conv = nn.Sequential(
-            nn.Conv2d(3, 16, kernel_size=3, padding=1),
-            nn.ReLU(),
-            nn.MaxPool2d(2),
-            nn.Conv2d(16, 32, kernel_size=3, padding=1),
-            nn.ReLU(),
-            nn.MaxPool2d(2),
-        )
-
-        # Calculate the flattened feature size dynamically
-        with torch.no_grad():
-            dummy = torch.randn(1, 3, 224, 224)
-            out = self.conv(dummy)
-            self.flatten_size = out.view(1, -1).shape[1]
-
-        self.fc = nn.Linear(self.flatten_size, num_classes)
-
-    def forward(self, x):
-        x = self.conv(x)
-        x = x.view(x.size(0), -1)
-        x = self.fc(x)
-        return x
-
-# Dataset location: put images in dataset/{class_name}/image.jpg
-data_dir = "dataset"  # make sure this folder exists and is filled with subfolders for each class
-
-transform = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-])
-
-dataset = datasets.ImageFolder(root=data_dir, transform=transform)
-dataloader = DataLoader(dataset, batch_size=32, shuffle=True)
-
-num_classes = len(dataset.classes)
-print(f"Detected {num_classes} classes.")
-
-model = PlantDiseaseModel(num_classes=num_classes)
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model = model.to(device)
-
-criterion = nn.CrossEntropyLoss()
-optimizer = optim.Adam(model.parameters(), lr=0.001)
-
-# Training loop
-for epoch in range(5):  # Increase to 10-20 later for better results
-    start_time = time.time()
-    ...
-    print(f"🕒 Time taken for epoch {epoch+1}: {time.time() - start_time:.2f} seconds")
+from PIL import Image
+from torch.utils.data import DataLoader, Subset
+from torchvision import datasets
+
+from backend.disease_model.dataset_cache import (
+    CACHE_DIR, MemmapImageDataset, collate_batch, read_manifest, to_float_batch
+)
+from backend.disease_model.model import MODEL_DIR, MODEL_PATHS, PlantDiseaseModel
+from backend.disease_model.preprocess import IMAGE_SIZE, decode_image
+
+CHECKPOINT_PATH = MODEL_DIR / "checkpoints" / "last.pt"
+METRICS_PATH = MODEL_DIR / "training_metrics.json"
+
+
+def _to_uint8_hwc(image: Image.Image):
+    # Same layout as the memmap cache, so both sources share to_float_batch.
+    if image.size != IMAGE_SIZE:
+        image = image.resize(IMAGE_SIZE, Image.BILINEAR)
+    return torch.from_numpy(np.asarray(image, dtype=np.uint8).copy())
+
+
+def load_dataset(data_dir, cache_dir, use_cache=True):
+    if use_cache and read_manifest(Path(cache_dir)) is not None:
+        dataset = MemmapImageDataset(cache_dir)
+        print(f"✅ Using memmap cache at {cache_dir} ({len(dataset)} images)")
+    else:
+        dataset = datasets.ImageFolder(root=data_dir, loader=decode_image, transform=_to_uint8_hwc)
+        print(f"✅ Decoding images from {data_dir} ({len(dataset)} images, no cache)")
+    return dataset
+
+
+def stratified_split(targets, val_fraction: float, seed: int):
+    """Per-class shuffled split; every class with 2+ images lands in both halves."""
+    rng = np.random.default_rng(seed)
+    targets = np.asarray(targets)
+    train_idx, val_idx = [], []
+    for label in np.unique(targets):
+        idx = rng.permutation(np.flatnonzero(targets == label))
+        n_val = int(round(len(idx) * val_fraction))
+        if len(idx) >= 2:
+            n_val = min(max(n_val, 1), len(idx) - 1)
+        val_idx.append(idx[:n_val])
+        train_idx.append(idx[n_val:])
+    return np.sort(np.concatenate(train_idx)), np.sort(np.concatenate(val_idx))
+
+
+def _subset(dataset, indices):
+    if isinstance(dataset, MemmapImageDataset):
+        return dataset.subset(indices)
+    return Subset(dataset, indices.tolist())
+
+
+def make_loader(dataset, args, shuffle):
+    kwargs = {}
+    if args.workers > 0:
+        kwargs = {"prefetch_factor": args.prefetch, "persistent_workers": True}
+    return DataLoader(
+        dataset,
+        batch_size=args.batch_size,
+        shuffle=shuffle,
+        num_workers=args.workers,
+        collate_fn=collate_batch,
+        pin_memory=torch.cuda.is_available(),
+        **kwargs,
+    )
+
+
+def _inputs(images, device):
+    return to_float_batch(images.to(device, non_blocking=True)).contiguous(memory_format=torch.channels_last)
+
+
+def train_one_epoch(model, loader, criterion, optimizer, device):
     model.train()
-    total_loss = 0
-
-    print(f"\n🔁 Epoch {epoch + 1}/5 started...")
-    
-    for batch_idx, (images, labels) in enumerate(dataloader):
-        images, labels = images.to(device), labels.to(device)
-
-        optimizer.zero_grad()
-        outputs = model(images)
-        loss = criterion(outputs, labels)
+    total_loss, seen, data_s, step_s = 0.0, 0, 0.0, 0.0
+    mark = time.perf_counter()
+    for batch_idx, (images, labels) in enumerate(loader):
+        fetched = time.perf_counter()
+        data_s += fetched - mark
+
+        images, labels = _inputs(images, device), labels.to(device)
+        optimizer.zero_grad(set_to_none=True)
+        loss = criterion(model(images), labels)
         loss.backward()
         optimizer.step()
 
-        total_loss += loss.item()
-
-        # Print progress every 10 batches
-        if (batch_idx + 1) % 10 == 0 or (batch_idx + 1) == len(dataloader):
-            print(f"  ✅ Batch {batch_idx + 1}/{len(dataloader)} - Current Loss: {loss.item():.4f}")
-
-    print(f"✅ Epoch {epoch + 1} complete! Total Loss: {total_loss:.4f}")
-
-# Save the model
-save_path = "backend/disease_model/plant_disease_model.pt"
-torch.save(model.state_dict(), save_path)
-print(f"Model saved at {save_path}")
-
-# ✅ Save model after training
-torch.save(model.state_dict(), "backend/disease_model/plant_disease_model.pt")
-print("Model saved to backend/disease_model/plant_disease_model.pt")
-
-label_map = dataset.class_to_idx  # e.g. {'Apple___Black_rot': 0, ...}
-idx_to_class = {v: k for k, v in label_map.items()}  # reverse it
-
-with open("backend/disease_model/class_labels.json", "w") as f:
-    json.dump(idx_to_class, f)
-
-print("Class labels saved to backend/disease_model/class_labels.json")
+        total_loss += loss.item() * len(labels)
+        seen += len(labels)
+        mark = time.perf_counter()
+        step_s += mark - fetched
+
+        if (batch_idx + 1) % 50 == 0 or (batch_idx + 1) == len(loader):
+            print(f"  ✅ Batch {batch_idx + 1}/{len(loader)} - Current Loss: {loss.item():.4f}")
+
+    steps = max(1, len(loader))
+    return {
+        "train_loss": total_loss / max(1, seen),
+        "train_images": seen,
+        "data_wait_ms": 1000 * data_s / steps,
+        "step_ms": 1000 * step_s / steps,
+    }
+
+
+@torch.no_grad()
+def evaluate(model, loader, criterion, device):
+    model.eval()
+    total_loss, correct, seen = 0.0, 0, 0
+    for images, labels in loader:
+        images, labels = _inputs(images, device), labels.to(device)
+        outputs = model(images)
+        total_loss += criterion(outputs, labels).item() * len(labels)
+        correct += (outputs.argmax(dim=1) == labels).sum().item()
+        seen += len(labels)
+    return {"val_loss": total_loss / max(1, seen), "val_accuracy": correct / max(1, seen)}
+
+
+def save_checkpoint(path: Path, state: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    torch.save(state, tmp)
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", default="dataset")
+    parser.add_argument("--cache-dir", default=str(CACHE_DIR))
+    parser.add_argument("--no-cache", action="store_true", help="decode dataset/ even if a cache exists")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--lr", type=float, default=0.001)
+    parser.add_argument("--val-fraction", type=float, default=0.1)
+    parser.add_argument("--patience", type=int, default=3, help="epochs without val-loss improvement before stopping")
+    parser.add_argument("--min-delta", type=float, default=1e-4)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--prefetch", type=int, default=4, help="batches prefetched per worker")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="torch intra-op threads")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--checkpoint", default=str(CHECKPOINT_PATH))
+    parser.add_argument("--fresh", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    torch.manual_seed(args.seed)
+    torch.set_num_threads(args.threads)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    dataset = load_dataset(args.data_dir, args.cache_dir, use_cache=not args.no_cache)
+    classes = dataset.classes
+    num_classes = len(classes)
+    print(f"Detected {num_classes} classes.")
+
+    train_idx, val_idx = stratified_split(dataset.targets, args.val_fraction, args.seed)
+    train_loader = make_loader(_subset(dataset, train_idx), args, shuffle=True)
+    val_loader = make_loader(_subset(dataset, val_idx), args, shuffle=False)
+    print(f"✅ {len(train_idx)} train / {len(val_idx)} val images")
+
+    model = PlantDiseaseModel(num_classes=num_classes).to(device, memory_format=torch.channels_last)
+    criterion = nn.CrossEntropyLoss()
+    optimizer = optim.Adam(model.parameters(), lr=args.lr)
+
+    checkpoint_path = Path(args.checkpoint)
+    state = {"epoch": 0, "best_val_loss": float("inf"), "best_epoch": 0, "stale_epochs": 0,
+             "best_model": None, "history": []}
+    if checkpoint_path.exists() and not args.fresh:
+        saved = torch.load(checkpoint_path, map_location="cpu")
+        if saved["classes"] != classes:
+            raise SystemExit(f"❌ {checkpoint_path} was trained on different classes; rerun with --fresh.")
+        model.load_state_dict(saved["model"])
+        optimizer.load_state_dict(saved["optimizer"])
+        torch.set_rng_state(saved["rng_state"])
+        state = {k: saved[k] for k in state}
+        print(f"🔁 Resuming from {checkpoint_path} after epoch {state['epoch']}")
+
+    for epoch in range(state["epoch"], args.epochs):
+        if state["stale_epochs"] >= args.patience:
+            break
+        print(f"\n🔁 Epoch {epoch + 1}/{args.epochs} started...")
+        start_time = time.time()
+
+        metrics = train_one_epoch(model, train_loader, criterion, optimizer, device)
+        metrics.update(evaluate(model, val_loader, criterion, device))
+        elapsed = time.time() - start_time
+        metrics.update({
+            "epoch": epoch + 1,
+            "seconds": elapsed,
+            "images_per_sec": metrics["train_images"] / elapsed,
+        })
+
+        if metrics["val_loss"] < state["best_val_loss"] - args.min_delta:
+            state.update(best_val_loss=metrics["val_loss"], best_epoch=epoch + 1, stale_epochs=0,
+                         best_model={k: v.detach().cpu().clone() for k, v in model.state_dict().items()})
+        else:
+            state["stale_epochs"] += 1
+        state["epoch"] = epoch + 1
+        state["history"].append(metrics)
+
+        print(f"✅ Epoch {epoch + 1} complete! train loss {metrics['train_loss']:.4f}, "
+              f"val loss {metrics['val_loss']:.4f}, val acc {metrics['val_accuracy']:.2%}")
+        print(f"🕒 {elapsed:.1f}s, {metrics['images_per_sec']:.1f} img/s, "
+              f"step {metrics['step_ms']:.1f} ms, data wait {metrics['data_wait_ms']:.1f} ms")
+
+        save_checkpoint(checkpoint_path, {
+            **state,
+            "classes": classes,
+            "model": model.state_dict(),
+            "optimizer": optimizer.state_dict(),
+            "rng_state": torch.get_rng_state(),
+        })
+
+    if state["stale_epochs"] >= args.patience:
+        print(f"⏹️ Early stopping: no val-loss improvement for {args.patience} epochs")
+
+    # ✅ Save the best weights once, plus the labels the API reads
+    save_path = MODEL_PATHS["fp32"]
+    torch.save(state["best_model"] or model.state_dict(), save_path)
+    print(f"Model saved at {save_path} (best epoch {state['best_epoch']})")
+
+    idx_to_class = {i: name for i, name in enumerate(classes)}
+    with open(MODEL_DIR / "class_labels.json", "w") as f:
+        json.dump(idx_to_class, f)
+    print("Class labels saved to backend/disease_model/class_labels.json")
+
+    with open(METRICS_PATH, "w") as f:
+        json.dump({"best_epoch": state["best_epoch"], "best_val_loss": state["best_val_loss"],
+                   "history": state["history"]}, f, indent=2)
+    print(f"Metrics saved to {METRICS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,27 +3,84 @@ from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from io import BytesIO
-from PIL import Image
+from contextlib import asynccontextmanager
+import asyncio
 import os
+import time
 from uuid import uuid4
 from datetime import datetime
 import humanize
-import pandas as pd
+import numpy as np
 
 # ✅ Service Imports
-from backend.services.predictor import get_crop_tips, get_top_matching_crops
-from backend.disease_model.predict_disease import router as disease_router, predict_image
-from backend.services.weather import get_weather_data
+from backend.services.predictor import get_crop_index, get_crop_tips, recommendation_cache
+from backend.services.crop_model import (
+    DEFAULT_MODE as CROP_RECOMMENDER, crop_model_batcher, get_crop_model, recommend_crops,
+    recommend_crops_batch, resolve_mode
+)
+from backend.disease_model import predict_disease as disease_service
+from backend.disease_model.predict_disease import (
+    router as disease_router, busy_response, classify_upload, disease_batcher, disease_cache, disease_executor
+)
+from backend.services.executor import ExecutorBusy
+from backend.services.weather import close_client as close_weather_client, get_weather_data, stats as weather_stats
+from backend.services.locations import get_location_index
+from backend.services.location_recs import get_location_recs
+from backend.services.resources import all_required_loaded, resource_status
 # ✅ Community Imports
 from backend.community import models as community_models
 from backend.community import routes as community_routes
-from backend.database.db import get_db
+from backend.community.feed_cache import feed_cache
+from backend.community.search import ensure_search_index
+from backend.community.uploads import UploadSizeLimit, thumbnail_pool
+from backend.database.db import async_engine
 
-from sqlalchemy.orm import Session
+# ✅ Startup warmup: load every heavy resource and run one dummy query each
+warmup_report = {}
 
-app = FastAPI()
+def _warmup_step(name, fn):
+    start = time.perf_counter()
+    try:
+        fn()
+        warmup_report[name] = {"ok": True, "seconds": round(time.perf_counter() - start, 3)}
+    except Exception as e:
+        warmup_report[name] = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        print(f"⚠️ Warmup step {name} failed:", e)
+
+def _warmup_knn():
+    index = get_crop_index()
+    if not index.empty:
+        index.query_nearest(index.transform([90, 42, 43, 25.0, 6.5, 200]), 5)
+
+def _warmup_crop_model():
+    get_crop_model().predict_top([[90, 42, 43, 25.0, 6.5, 200]])
+
+def warmup():
+    _warmup_step("knn_query", _warmup_knn)
+    if CROP_RECOMMENDER == "model":
+        _warmup_step("crop_model", _warmup_crop_model)
+    _warmup_step("location_index", get_location_index)
+    _warmup_step("location_recs", get_location_recs)
+    _warmup_step("disease_inference", disease_service.warmup)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # ✅ Create DB Tables
+    async with async_engine.begin() as conn:
+        await conn.run_sync(community_models.Base.metadata.create_all)
+        await conn.run_sync(community_models.ensure_indexes)
+        await conn.run_sync(ensure_search_index)
+    if os.getenv("WARMUP_ON_STARTUP", "1") == "1":
+        await run_in_threadpool(warmup)
+    yield
+    await close_weather_client()
+    await async_engine.dispose()
+    disease_executor.shutdown()
+    thumbnail_pool.shutdown(wait=False)
+
+app = FastAPI(lifespan=lifespan)
 
 # ✅ CORS
 app.add_middleware(
@@ -34,6 +91,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ✅ Oversized community uploads are refused while streaming, not after spooling
+app.add_middleware(UploadSizeLimit, paths=["/community/post"])
+
 # ✅ Static & Templates
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
@@ -43,69 +103,49 @@ app.templates = templates
 app.include_router(disease_router)
 app.include_router(community_routes.router)
 
-# ✅ Create DB Tables
-db = next(get_db())
-community_models.Base.metadata.create_all(bind=db.bind)
-
-# ✅ Load dataset for location lookup
-PARQUET_PATH = "backend/data/all_crops.parquet"
-if os.path.exists(PARQUET_PATH):
-    try:
-        district_df = pd.read_parquet(PARQUET_PATH)
-        if "state" in district_df.columns:
-            district_df["state"] = district_df["state"].astype(str).str.lower()
-        if "district" in district_df.columns:
-            district_df["district"] = district_df["district"].astype(str).str.lower()
-        if "season" in district_df.columns:
-            district_df["season"] = district_df["season"].astype(str).str.lower()
-        print(f"✅ Loaded parquet for location lookup: {district_df.shape}")
-    except Exception as e:
-        print("⚠️ Failed to load parquet:", e)
-        district_df = pd.DataFrame()
-else:
-    district_df = pd.DataFrame()
-    print("⚠️ all_crops.parquet not found — location lookup disabled.")
+# ✅ Location lookup over the shared feature store (same artifact as the predictor)
+def get_district_data(state: str, district: str, season: str):
+    """(row, [N, P, K, avg_temp_C, ph, rainfall], seasonal temperature) for a location.
 
-def get_district_data(state: str, district: str, season: str, temperature: float):
-    if district_df.empty:
-        return None
+    The row falls back to the district when the season is not in the data; the
+    seasonal temperature is only given for an exact state/district/season match
+    with a recorded value, otherwise it is None. Returns (None, None, None) if
+    the district is unknown.
+    """
+    location_index = get_location_index()
+    if location_index.empty:
+        return None, None, None
 
     try:
-        state_l = state.strip().lower()
-        district_l = district.strip().lower()
-        season_l = season.strip().lower()
-
         print(f"🔍 Looking for state={state}, district={district}, season={season}")
-        rows = district_df[
-            (district_df["state"] == state_l) &
-            (district_df["district"] == district_l) &
-            (district_df["season"] == season_l)
-        ]
-
-        if rows.empty:
-            print("⚠️ No exact match found, trying fallback state+district only")
-            rows = district_df[
-                (district_df["state"] == state_l) &
-                (district_df["district"] == district_l)
-            ]
+        row, exact = location_index.match(state, district, season)
+        if row is None:
+            print("❌ No data found")
+            return None, None, None
 
-        if rows.empty:
-            print("❌ Still no data found")
-            return None
+        seasonal_temperature = location_index.value(row, 3) if exact else None
+        return row, location_index.features(row), seasonal_temperature
+    except Exception as e:
+        print("⚠️ get_district_data error:", e)
+        return None, None, None
 
-        row = rows.iloc[0]
+# ✅ Live temperature for a location, bounded by a deadline
+WEATHER_DEADLINE_S = float(os.getenv("PREDICT_WEATHER_DEADLINE_S", "1.5"))
 
-        N = float(row.get("N", row.get("N_kg_ha", 0)))
-        P = float(row.get("P", row.get("P_kg_ha", 0)))
-        K = float(row.get("K", row.get("K_kg_ha", 0)))
-        humidity = float(row.get("humidity", 0))  # not in dataset, keep fallback 0
-        ph_val = float(row.get("ph", row.get("soil_ph", 0)))
-        rainfall = float(row.get("rainfall", row.get("avg_rainfall_mm", 0)))
+async def get_live_temperature(lat, lon):
+    """Current temperature at lat/lon, or None if weather is not available in time.
 
-        return [N, P, K, float(temperature), ph_val, rainfall]
+    The upstream call keeps running after the deadline, so the answer still
+    lands in the weather cache for the next request.
+    """
+    try:
+        weather = await asyncio.wait_for(get_weather_data(lat, lon), WEATHER_DEADLINE_S)
+        return float(weather["temperature_c"])
+    except asyncio.TimeoutError:
+        print(f"⚠️ Weather slower than {WEATHER_DEADLINE_S}s, using seasonal default")
     except Exception as e:
-        print("⚠️ get_district_data error:", e)
-        return None
+        print("⚠️ Weather unavailable, using seasonal default:", e)
+    return None
 
 # ✅ Page Routes
 @app.get("/", response_class=HTMLResponse)
@@ -125,6 +165,9 @@ def crop_page(request: Request):
         "tips": None
     })
 
+# Raised as FileNotFoundError when mode=model is asked for before the model is trained
+CROP_MODEL_UNAVAILABLE = "Crop model is not available; train it with backend/train_model.py or use mode=knn"
+
 @app.post("/crop", response_class=HTMLResponse)
 async def predict_crop_form(
     request: Request,
@@ -133,10 +176,29 @@ async def predict_crop_form(
     potassium: float = Form(...),
     temperature: float = Form(...),
     ph: float = Form(...),
-    rainfall: float = Form(...)
+    rainfall: float = Form(...),
+    mode: str = Form(None)
 ):
     input_values = [nitrogen, phosphorus, potassium, temperature, ph, rainfall]
-    top_crops = get_top_matching_crops(input_values)
+    error = None
+    try:
+        top_crops = await recommend_crops(input_values, mode)
+        if not top_crops:
+            error = "No crops found"
+    except ValueError as e:
+        error = str(e)
+    except FileNotFoundError:
+        error = CROP_MODEL_UNAVAILABLE
+
+    if error:
+        return templates.TemplateResponse("crop.html", {
+            "request": request,
+            "top_crops": None,
+            "recommended_crop": None,
+            "tips": None,
+            "error": error
+        }, status_code=400)
+
     recommended_crop = top_crops[0]["crop"]
     tips = top_crops[0]["tips"]
 
@@ -150,6 +212,11 @@ async def predict_crop_form(
 # ✅ Crop Recommendation – JSON API Route
 @app.post("/predict-json")
 async def predict_crop_api(data: dict = Body(...)):
+    try:
+        mode = resolve_mode(data.get("mode"))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
     try:
         input_values = [
             data["nitrogen"],
@@ -160,7 +227,7 @@ async def predict_crop_api(data: dict = Body(...)):
             data["rainfall"]
         ]
 
-        top_crops = get_top_matching_crops(input_values)
+        top_crops = await recommend_crops(input_values, mode)
         recommended_crop = top_crops[0]["crop"]
         tips = top_crops[0]["tips"] or {}
 
@@ -170,6 +237,8 @@ async def predict_crop_api(data: dict = Body(...)):
             "tips": tips
         }
 
+    except FileNotFoundError:
+        return JSONResponse({"error": CROP_MODEL_UNAVAILABLE}, status_code=400)
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
@@ -177,6 +246,74 @@ async def predict_crop_api(data: dict = Body(...)):
 async def predict_crop_alias(data: dict = Body(...)):
     return await predict_crop_api(data)
 
+# ✅ Batch Crop Recommendation – many soil samples in one call
+CROP_INPUT_FIELDS = ["nitrogen", "phosphorus", "potassium", "temperature", "ph", "rainfall"]
+BATCH_MAX_SAMPLES = int(os.getenv("CROP_BATCH_MAX_SAMPLES", "10000"))
+
+def _parse_batch_sample(sample):
+    """Return ([N, P, K, temperature, ph, rainfall], None) or (None, error message)."""
+    try:
+        if isinstance(sample, dict):
+            values = [sample[field] for field in CROP_INPUT_FIELDS]
+        elif isinstance(sample, (list, tuple)) and len(sample) == len(CROP_INPUT_FIELDS):
+            values = list(sample)
+        else:
+            return None, f"Expected an object with {CROP_INPUT_FIELDS} or a list of 6 numbers"
+        values = [float(v) for v in values]
+        if not np.all(np.isfinite(values)):
+            return None, "All values must be finite numbers"
+        return values, None
+    except KeyError as e:
+        return None, f"Missing field {e}"
+    except (TypeError, ValueError):
+        return None, "All values must be numbers"
+
+@app.post("/predict-batch")
+async def predict_crop_batch(data: dict = Body(...)):
+    samples = data.get("samples")
+    if not isinstance(samples, list):
+        return JSONResponse({"error": "Body must contain a 'samples' list"}, status_code=400)
+    if len(samples) > BATCH_MAX_SAMPLES:
+        return JSONResponse(
+            {"error": f"At most {BATCH_MAX_SAMPLES} samples per request"},
+            status_code=413
+        )
+    try:
+        mode = resolve_mode(data.get("mode"))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    try:
+        parsed = [_parse_batch_sample(s) for s in samples]
+        valid = [values for values, error in parsed if error is None]
+        matches = iter(await run_in_threadpool(recommend_crops_batch, valid, mode))
+
+        results = []
+        for values, error in parsed:
+            if error is not None:
+                results.append({"error": error})
+                continue
+            top_crops = next(matches)
+            if not top_crops:
+                results.append({"error": "No crops found"})
+                continue
+            results.append({
+                "recommended_crop": top_crops[0]["crop"],
+                "top_crops": [c["crop"] for c in top_crops],
+                "tips": top_crops[0]["tips"] or {}
+            })
+
+        return {
+            "results": results,
+            "count": len(results),
+            "errors": sum(1 for r in results if "error" in r)
+        }
+
+    except FileNotFoundError:
+        return JSONResponse({"error": CROP_MODEL_UNAVAILABLE}, status_code=400)
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
 # ✅ New endpoint: Predict using location
 @app.post("/predict-location")
 async def predict_from_location(data: dict = Body(...)):
@@ -185,21 +322,53 @@ async def predict_from_location(data: dict = Body(...)):
         district = str(data.get("district", "")).strip().lower()
         season = str(data.get("season", "")).strip().lower()
         temperature = data.get("temperature")
+        lat, lon = data.get("lat"), data.get("lon")
+        mode = resolve_mode(data.get("mode"))
 
-        if not (state and district and season and (temperature is not None)):
+        if not (state and district and season):
             return JSONResponse(
-                {"error": "Missing one of state / district / season / temperature"},
+                {"error": "Missing one of state / district / season"},
                 status_code=400
             )
 
-        input_values = get_district_data(state, district, season, temperature)
-        if not input_values:
+        # Without a temperature, fetch the weather while the location is looked up
+        lookup = run_in_threadpool(get_district_data, state, district, season)
+        if temperature is None and lat is not None and lon is not None:
+            live_temperature, (row, features, seasonal_temperature) = await asyncio.gather(
+                get_live_temperature(lat, lon), lookup
+            )
+        else:
+            live_temperature, (row, features, seasonal_temperature) = None, await lookup
+
+        if row is None:
             return JSONResponse(
                 {"error": f"No location data found for {state}-{district}-{season}"},
                 status_code=404
             )
 
-        top_crops = get_top_matching_crops(input_values)
+        if temperature is not None:
+            temperature, temperature_source = float(temperature), "request"
+        elif live_temperature is not None:
+            temperature, temperature_source = live_temperature, "weather"
+        elif seasonal_temperature is not None:
+            # The dataset's average temperature for this district and season
+            temperature, temperature_source = seasonal_temperature, "seasonal_default"
+        else:
+            return JSONResponse(
+                {"error": f"No recorded temperature for {state}-{district}-{season}; "
+                          "send temperature or lat/lon"},
+                status_code=400
+            )
+
+        # Serve the precomputed k-NN answer when the temperature is in the built range
+        top_crops = None
+        if mode == "knn":
+            top_crops = get_location_recs().lookup(row, temperature)
+
+        if top_crops is None:
+            input_values = features[:3] + [temperature] + features[4:]
+            top_crops = await recommend_crops(input_values, mode)
+
         if not top_crops:
             return JSONResponse({"error": "No crops found"}, status_code=404)
 
@@ -209,9 +378,15 @@ async def predict_from_location(data: dict = Body(...)):
         return {
             "recommended_crop": recommended_crop,
             "top_crops": top_crops,   # ✅ now contains [{crop, similarity, tips}, ...]
-            "tips": tips
+            "tips": tips,
+            "temperature": round(temperature, 1),
+            "temperature_source": temperature_source
         }
 
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except FileNotFoundError:
+        return JSONResponse({"error": CROP_MODEL_UNAVAILABLE}, status_code=400)
     except Exception as e:
         print("❌ Error in /predict-location:", e)
         return JSONResponse(content={"error": str(e)}, status_code=500)
@@ -220,30 +395,51 @@ async def predict_from_location(data: dict = Body(...)):
 # ✅ Locations API
 @app.get("/locations")
 async def get_locations(state: str = Query(None), district: str = Query(None)):
-    if district_df.empty:
+    location_index = get_location_index()
+    if location_index.empty:
         return JSONResponse({"error": "No dataset loaded"}, status_code=500)
 
     try:
         if state is None and district is None:
-            states = sorted(district_df["state"].dropna().unique().tolist())
-            return {"states": states}
+            return {"states": location_index.states}
 
         if state is not None and district is None:
-            districts = sorted(
-                district_df[district_df["state"] == state.lower()]["district"].dropna().unique().tolist()
-            )
-            return {"districts": districts}
+            return {"districts": location_index.districts(state)}
 
         if district is not None:
-            seasons = sorted(
-                district_df[district_df["district"] == district.lower()]["season"].dropna().unique().tolist()
-            )
-            return {"seasons": seasons}
+            # District names repeat across states, so scope by state when given.
+            return {"seasons": location_index.seasons(district, state)}
 
         return {}
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
+# ✅ Liveness & Readiness
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    ready = all_required_loaded()
+    return JSONResponse(
+        {"ready": ready, "resources": resource_status(), "warmup": warmup_report},
+        status_code=200 if ready else 503
+    )
+
+# ✅ Runtime metrics (cache counters etc.)
+@app.get("/metrics")
+async def get_metrics():
+    return {
+        "crop_cache": recommendation_cache.stats(),
+        "crop_model_batching": crop_model_batcher.stats(),
+        "disease_batching": disease_batcher.stats(),
+        "disease_executor": disease_executor.stats(),
+        "disease_cache": disease_cache.stats(),
+        "community_feed_cache": feed_cache.stats(),
+        "weather": weather_stats()
+    }
+
 # ✅ Soil Type Prediction + Recommendation
 @app.post("/predict_soil", response_class=HTMLResponse)
 async def predict_soil(request: Request, sand: float = Form(...), silt: float = Form(...), clay: float = Form(...)):
@@ -289,9 +485,10 @@ async def disease_ui(request: Request):
 async def detect_disease(file: UploadFile = File(...)):
     try:
         contents = await file.read()
-        image = Image.open(BytesIO(contents)).convert("RGB")
-        label = predict_image(image)
+        label = await classify_upload(contents)
         return {"disease": label}
+    except ExecutorBusy as e:
+        return busy_response(e)
     except Exception as e:
         return {"error": str(e)}
 
@@ -1,22 +1,170 @@
-import pandas as pd
+"""Stream every CSV in backend/data into a state-partitioned parquet dataset.
+
+    python -m backend.merge_crops
+
+CSVs are read block by block through pyarrow, so memory stays flat however
+many files there are. Column names are normalized to the feature store's
+canonical names (``N`` -> ``N_kg_ha`` etc.), features are cast to float32
+and state/district/season/crop are dictionary-encoded. The output is
+``all_crops.parquet/state=<name>/*.parquet``, which the feature store and
+trainer read as one dataset and which can be filtered to a single state
+without touching the other partitions.
+"""
+import argparse
+import csv
+import os
+import shutil
+import time
 from pathlib import Path
 
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pcsv
+import pyarrow.dataset as ds
+
+from backend.services.feature_store import (
+    CATEGORICAL_COLUMNS, DATA_PATH, FEATURE_ALIASES, FEATURE_COLUMNS, LOWERCASE_COLUMNS
+)
+
 # 1. Where your CSVs are stored
-DATA_DIR = Path("backend/data")
+DATA_DIR = DATA_PATH.parent
+PARTITION_COLUMN = "state"
+
+CATEGORY_TYPE = pa.dictionary(pa.int32(), pa.string())
+SCHEMA = pa.schema(
+    [(col, CATEGORY_TYPE) for col in CATEGORICAL_COLUMNS]
+    + [(col, pa.float32()) for col in FEATURE_COLUMNS]
+)
+
+# Header (case-insensitive, trimmed) -> canonical column
+HEADER_ALIASES = {col.lower(): col for col in CATEGORICAL_COLUMNS}
+for canonical, aliases in FEATURE_ALIASES.items():
+    HEADER_ALIASES.update({alias.lower(): canonical for alias in aliases})
+
+
+def _header(path: Path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f), [])
+
+
+def _normalize_batch(batch: pa.RecordBatch, renames: dict):
+    """Canonical names, float32 features, trimmed dictionary categoricals."""
+    arrays = []
+    for field in SCHEMA:
+        source = renames.get(field.name)
+        if source is None:
+            arrays.append(pa.nulls(batch.num_rows, type=field.type))
+            continue
+        column = batch.column(source)
+        if field.name in FEATURE_COLUMNS:
+            arrays.append(pc.cast(column, pa.float32()))
+        else:
+            column = pc.utf8_trim_whitespace(pc.cast(column, pa.string()))
+            if field.name in LOWERCASE_COLUMNS:
+                column = pc.utf8_lower(column)
+            arrays.append(pc.dictionary_encode(column).cast(CATEGORY_TYPE))
+    return pa.RecordBatch.from_arrays(arrays, schema=SCHEMA)
+
+
+def stream_csv(path: Path, block_size: int, stats: dict):
+    header = _header(path)
+    renames = {}
+    for name in header:
+        canonical = HEADER_ALIASES.get(name.strip().lower())
+        if canonical and canonical not in renames:
+            renames[canonical] = name
+    missing = [col for col in SCHEMA.names if col not in renames]
+    if missing:
+        print(f"⚠️ {path.name}: no column for {missing}, filled with nulls")
+
+    # Only the recognised columns are parsed, each straight into its final type.
+    convert = pcsv.ConvertOptions(
+        include_columns=list(renames.values()),
+        column_types={
+            source: pa.float32() if canonical in FEATURE_COLUMNS else pa.string()
+            for canonical, source in renames.items()
+        },
+    )
+    reader = pcsv.open_csv(path, read_options=pcsv.ReadOptions(block_size=block_size), convert_options=convert)
+    for batch in reader:
+        stats["rows"] += batch.num_rows
+        yield _normalize_batch(batch, renames)
+
+
+def _dir_size(path: Path):
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def _swap_into_place(tmp: Path, output: Path):
+    """Replace ``output`` with ``tmp``, deleting the old dataset only once the new one is in place.
+
+    A directory cannot be replaced in one rename, so the old one is renamed aside
+    first; the gap is two renames long and a crash in it leaves the previous
+    dataset at ``.<name>.old`` rather than deleted.
+    """
+    old = output.with_name(f".{output.name}.old")
+    if old.is_dir():
+        shutil.rmtree(old)
+    elif old.exists():
+        old.unlink()
+    if output.exists():
+        os.rename(output, old)
+    os.rename(tmp, output)
+    if old.is_dir():
+        shutil.rmtree(old)
+    elif old.exists():
+        old.unlink()
+
+
+def merge(csv_files, output: Path, block_size: int, rows_per_group: int):
+    stats = {"rows": 0}
+    batches = (batch for f in csv_files for batch in stream_csv(f, block_size, stats))
+
+    # Write next to the target and swap it in, so readers never see a partially written dataset.
+    tmp = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    start = time.perf_counter()
+    ds.write_dataset(
+        batches,
+        tmp,
+        schema=SCHEMA,
+        format="parquet",
+        partitioning=[PARTITION_COLUMN],
+        partitioning_flavor="hive",
+        min_rows_per_group=min(rows_per_group, 32768),
+        max_rows_per_group=rows_per_group,
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    elapsed = time.perf_counter() - start
+
+    _swap_into_place(tmp, output)
+
+    size_mb = _dir_size(output) / 1e6
+    partitions = sum(1 for p in output.iterdir() if p.is_dir())
+    rate = stats["rows"] / elapsed if elapsed > 0 else 0.0
+    print(f"✅ Merged {stats['rows']} rows into {partitions} {PARTITION_COLUMN} partitions "
+          f"in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+    print(f"🎉 Saved {output} ({size_mb:.1f} MB)")
+    return stats["rows"]
 
-# 2. List all CSV files automatically (no manual typing needed)
-csv_files = list(DATA_DIR.glob("*.csv"))
 
-print(f"✅ Found {len(csv_files)} CSV files:", [f.name for f in csv_files])
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", default=str(DATA_DIR))
+    parser.add_argument("--output", default=str(DATA_PATH))
+    parser.add_argument("--block-size", type=int, default=16 << 20, help="CSV bytes parsed per batch")
+    parser.add_argument("--rows-per-group", type=int, default=131072, help="max parquet row group size")
+    args = parser.parse_args()
 
-# 3. Read and merge them
-df_list = [pd.read_csv(f) for f in csv_files]
-merged_df = pd.concat(df_list, ignore_index=True)
+    # 2. List all CSV files automatically (no manual typing needed)
+    csv_files = sorted(Path(args.data_dir).glob("*.csv"))
+    print(f"✅ Found {len(csv_files)} CSV files:", [f.name for f in csv_files])
+    if not csv_files:
+        raise SystemExit("❌ Nothing to merge.")
 
-print(f"✅ Merged shape: {merged_df.shape}")
+    # 3. Stream, normalize and write partitioned parquet
+    merge(csv_files, Path(args.output), args.block_size, args.rows_per_group)
 
-# 4. Save optimized Parquet file
-output_file = DATA_DIR / "all_crops.parquet"
-merged_df.to_parquet(output_file, index=False)
 
-print(f"🎉 Saved merged file as {output_file}")
+if __name__ == "__main__":
+    main()
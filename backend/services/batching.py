@@ -0,0 +1,105 @@
+import asyncio
+from collections import Counter
+
+
+class MicroBatcher:
+    """Collect concurrent async requests into one call of ``process_batch``.
+
+    A batch is flushed when it reaches ``max_batch_size`` items or when the first
+    item has waited ``max_wait_ms``. ``process_batch`` takes a list of items and
+    returns a list of results in the same order; it runs on ``executor`` when one
+    is given, otherwise inline on the event loop.
+    """
+
+    def __init__(self, process_batch, max_batch_size=16, max_wait_ms=5.0, executor=None, name="batcher"):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max_wait_ms
+        self.executor = executor
+        self.name = name
+        self.histogram = Counter()
+        self.batches = 0
+        self.items = 0
+        self._queue = None
+        self._wakeup = None
+        self._loop = None
+        self._worker = None
+
+    async def submit(self, item):
+        """Queue ``item`` and wait for its result from the next batch."""
+        loop = asyncio.get_running_loop()
+        self._ensure_worker(loop)
+        future = loop.create_future()
+        self._queue.put_nowait((item, future))
+        self._wakeup.set()
+        return await future
+
+    def _ensure_worker(self, loop):
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._wakeup = asyncio.Event()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                # Wait for a submit() signal rather than wrapping Queue.get in wait_for:
+                # on Python 3.10 a timeout racing a completed get() drops that item.
+                # Items stay in the queue here, so a timeout can never lose one.
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+            # Requests whose caller already gave up need no compute.
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                continue
+            self.histogram[len(batch)] += 1
+            self.batches += 1
+            self.items += len(batch)
+
+            items = [item for item, _ in batch]
+            try:
+                if self.executor is None:
+                    results = self.process_batch(items)
+                else:
+                    results = await loop.run_in_executor(self.executor, self.process_batch, items)
+                results = list(results)
+                # A short result list would leave the unmatched callers waiting forever.
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name}: process_batch returned {len(results)} results "
+                                       f"for {len(batch)} items")
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self.histogram.items())},
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
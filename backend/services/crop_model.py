@@ -0,0 +1,121 @@
+import hashlib
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from backend.services.batching import MicroBatcher
+from backend.services.feature_store import FEATURE_COLUMNS
+from backend.services.predictor import get_crop_tips, get_top_matching_crops, get_top_matching_crops_batch
+from backend.services.resources import LazyResource
+
+# ✅ Paths (written by backend/train_model.py)
+MODEL_DIR = Path(__file__).resolve().parent.parent / "model"
+MODEL_PATH = MODEL_DIR / "crop_recommendation.pkl"
+PREPROCESSOR_PATH = MODEL_DIR / "preprocessor.pkl"
+
+# ✅ Recommendation modes: "knn" (nearest dataset rows) or "model" (trained classifier)
+RECOMMENDER_MODES = ("knn", "model")
+DEFAULT_MODE = os.getenv("CROP_RECOMMENDER", "knn")
+
+
+def resolve_mode(mode=None):
+    """Per-request ``mode`` if given, else CROP_RECOMMENDER; raises ValueError if unknown."""
+    mode = (mode or DEFAULT_MODE).strip().lower()
+    if mode not in RECOMMENDER_MODES:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {list(RECOMMENDER_MODES)}")
+    return mode
+
+
+class CropModel:
+    """HistGradientBoosting classifier plus its preprocessor.
+
+    Inference cost depends on the number of trees, not on dataset size.
+    Missing inputs are passed through as NaN: the preprocessor from
+    train_model.py imputes them with training medians, and a model trained
+    with an older bare scaler saw NaN during training too.
+    """
+
+    def __init__(self, model, scaler, version):
+        self.model = model
+        self.scaler = scaler
+        self.version = version
+        self.classes = np.asarray(model.classes_, dtype=object)
+        # Older preprocessors were fitted on a named DataFrame and expect one back.
+        self.feature_names = getattr(scaler, "feature_names_in_", None)
+
+    def predict_top(self, inputs, top_n=5):
+        """Top ``top_n`` crops by probability for each raw [N, P, K, temperature, ph, rainfall] row."""
+        X = np.asarray(inputs, dtype=np.float64).reshape(-1, len(FEATURE_COLUMNS))
+        if self.feature_names is not None:
+            import pandas as pd
+
+            X = pd.DataFrame(X, columns=self.feature_names)
+        proba = self.model.predict_proba(self.scaler.transform(X))
+        k = min(top_n, proba.shape[1])
+        top = np.argsort(-proba, axis=1, kind="stable")[:, :k]
+
+        results = []
+        for row_proba, row_top in zip(proba, top):
+            matches = []
+            for idx in row_top:
+                crop_name = str(self.classes[idx])
+                matches.append({
+                    "crop": crop_name,
+                    # Same key as the k-NN path so templates and clients need no change.
+                    "similarity": round(float(row_proba[idx]) * 100, 2),
+                    "tips": get_crop_tips(crop_name)
+                })
+            results.append(matches)
+        return results
+
+
+def _load_crop_model():
+    with open(MODEL_PATH, "rb") as f:
+        model = pickle.load(f)
+    with open(PREPROCESSOR_PATH, "rb") as f:
+        scaler = pickle.load(f)
+
+    digest = hashlib.sha1()
+    for path in (MODEL_PATH, PREPROCESSOR_PATH):
+        digest.update(path.read_bytes())
+    loaded = CropModel(model, scaler, digest.hexdigest()[:12])
+    print(f"✅ Loaded crop model ({loaded.version}, {len(loaded.classes)} classes)")
+    return loaded
+
+crop_model_resource = LazyResource("crop_model", _load_crop_model, required=DEFAULT_MODE == "model")
+get_crop_model = crop_model_resource.get
+
+
+# ✅ Concurrent requests share one predict_proba call
+CROP_MODEL_TOP_N = 5
+
+def _predict_rows(rows):
+    return get_crop_model().predict_top(rows, CROP_MODEL_TOP_N)
+
+crop_model_batcher = MicroBatcher(
+    _predict_rows,
+    max_batch_size=int(os.getenv("CROP_MODEL_MAX_BATCH", "64")),
+    max_wait_ms=float(os.getenv("CROP_MODEL_MAX_WAIT_MS", "2")),
+    executor=ThreadPoolExecutor(max_workers=1, thread_name_prefix="crop-model"),
+    name="crop_model",
+)
+
+
+# ✅ Single entry points used by the routes
+async def recommend_crops(user_input: list, mode=None):
+    """Top crops for one [N, P, K, temperature, ph, rainfall] input in the chosen mode."""
+    if resolve_mode(mode) == "model":
+        return await crop_model_batcher.submit(list(user_input))
+    return get_top_matching_crops(user_input)
+
+
+def recommend_crops_batch(user_inputs: list, mode=None):
+    """Top crops for many inputs; blocking, run it off the event loop."""
+    if resolve_mode(mode) == "model":
+        if not user_inputs:
+            return []
+        return get_crop_model().predict_top(user_inputs, CROP_MODEL_TOP_N)
+    return get_top_matching_crops_batch(user_inputs)
@@ -0,0 +1,56 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+
+class ExecutorBusy(Exception):
+    """Raised when a BoundedExecutor already has ``max_pending`` requests in flight."""
+
+
+class BoundedExecutor:
+    """Dedicated thread pool for CPU-bound work, with admission control.
+
+    ``admit()`` caps how many requests may be in flight at once; beyond that new
+    requests fail fast with ExecutorBusy instead of queueing without bound, so
+    the event loop and cheap routes keep their latency while the pool is
+    saturated.
+    """
+
+    def __init__(self, max_workers=2, max_pending=32, name="executor"):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.pending = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def admit(self):
+        # Only touched from the event loop thread, so a plain counter is enough.
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorBusy(f"{self.name} is busy ({self.pending} requests in flight)")
+        self.pending += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.pending -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,302 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backend.services.resources import LazyResource
+
+# ✅ Paths
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DATA_PATH = BASE_DIR / "backend" / "data" / "all_crops.parquet"
+STORE_DIR = BASE_DIR / "backend" / "data" / "feature_store"
+
+# Bump when the artifact layout changes so old builds are not reused.
+SCHEMA_VERSION = 3
+
+# ✅ Feature columns in user input order: [N, P, K, temperature, ph, rainfall]
+FEATURE_COLUMNS = ["N_kg_ha", "P_kg_ha", "K_kg_ha", "avg_temp_C", "soil_ph", "avg_rainfall_mm"]
+
+# Source CSVs do not agree on names, so accept the short forms too.
+FEATURE_ALIASES = {
+    "N_kg_ha": ["N_kg_ha", "N"],
+    "P_kg_ha": ["P_kg_ha", "P"],
+    "K_kg_ha": ["K_kg_ha", "K"],
+    "avg_temp_C": ["avg_temp_C", "temperature"],
+    "soil_ph": ["soil_ph", "ph"],
+    "avg_rainfall_mm": ["avg_rainfall_mm", "rainfall"],
+}
+
+# ✅ Categorical columns; location columns are matched case-insensitively
+CATEGORICAL_COLUMNS = ["state", "district", "season", "crop"]
+LOWERCASE_COLUMNS = {"state", "district", "season"}
+
+
+class FeatureStore:
+    """Read-only view of one artifact build.
+
+    ``features`` is the float32 scaled matrix and ``codes`` hold int32 category
+    codes (-1 for missing). Both are memory-mapped, so every worker on the box
+    shares the same pages through the OS cache. Missing feature values are
+    stored as 0 in ``features``; ``missing`` flags them.
+    """
+
+    def __init__(self, version, features, codes, categories, scaler, missing=None):
+        self.version = version
+        self.features = features
+        self.missing = missing if missing is not None else np.zeros(features.shape, dtype=bool)
+        self.codes = codes
+        self.categories = categories
+        self.scaler = scaler
+        self._code_lookup = {
+            col: {name: i for i, name in enumerate(names)} for col, names in categories.items()
+        }
+
+    @property
+    def empty(self):
+        return len(self.features) == 0
+
+    def __len__(self):
+        return len(self.features)
+
+    def code(self, column: str, value: str):
+        """Category code of ``value`` in ``column``, or None if it never occurs."""
+        if column in LOWERCASE_COLUMNS:
+            value = value.lower()
+        return self._code_lookup.get(column, {}).get(value)
+
+    def label(self, column: str, code: int):
+        return self.categories[column][code] if code >= 0 else None
+
+    def raw_features(self, rows):
+        """Unscaled feature values for the given row positions."""
+        return self.scaler.inverse_transform(np.asarray(self.features[rows], dtype=np.float64))
+
+
+def empty_store():
+    return FeatureStore(
+        version="empty",
+        features=np.empty((0, len(FEATURE_COLUMNS)), dtype=np.float32),
+        codes={col: np.empty(0, dtype=np.int32) for col in CATEGORICAL_COLUMNS},
+        categories={col: [] for col in CATEGORICAL_COLUMNS},
+        scaler=None,
+    )
+
+
+def _source_files(data_path: Path):
+    if data_path.is_dir():
+        return sorted(p for p in data_path.rglob("*.parquet") if p.is_file())
+    return [data_path]
+
+
+def source_version(data_path: Path = DATA_PATH):
+    """Version of the artifact built from ``data_path`` (file or partitioned dir)."""
+    digest = hashlib.sha1(f"schema={SCHEMA_VERSION}".encode())
+    for f in _source_files(data_path):
+        stat = f.stat()
+        digest.update(f"{f.relative_to(data_path.parent)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+
+def open_source(data_path: Path = DATA_PATH):
+    """pyarrow dataset over the source parquet (single file or hive-partitioned dir)."""
+    import pyarrow.dataset as ds
+
+    return ds.dataset(str(data_path), format="parquet", partitioning="hive")
+
+
+def read_state(state: str, columns=None, data_path: Path = DATA_PATH):
+    """Rows for one state as a pyarrow Table.
+
+    On the state-partitioned layout written by merge_crops.py the filter is
+    resolved from directory names, so only that state's files are opened.
+    """
+    import pyarrow.dataset as ds
+
+    dataset = open_source(data_path)
+    if columns is not None:
+        columns = list(resolve_columns(dataset.schema.names, columns).values())
+    return dataset.to_table(columns=columns, filter=ds.field("state") == state.strip().lower())
+
+
+def resolve_columns(available, wanted=FEATURE_COLUMNS + CATEGORICAL_COLUMNS):
+    """Map each canonical column in ``wanted`` to its name in the source schema."""
+    available = set(available)
+    columns = {}
+    for canonical in wanted:
+        aliases = FEATURE_ALIASES.get(canonical, [canonical])
+        name = next((a for a in aliases if a in available), None)
+        if name is None:
+            raise KeyError(f"No column for {canonical} (tried {aliases})")
+        columns[canonical] = name
+    return columns
+
+
+def _read_source(data_path: Path):
+    dataset = open_source(data_path)
+    columns = resolve_columns(dataset.schema.names)
+    df = dataset.to_table(columns=list(columns.values())).to_pandas()
+    return df.rename(columns={v: k for k, v in columns.items()})
+
+
+def build_feature_store(data_path: Path = DATA_PATH, store_dir: Path = STORE_DIR):
+    """Build the artifact for the current source files if it does not exist yet.
+
+    Builds go to a temporary directory that is renamed into place, so workers
+    starting at the same time never see a half-written artifact.
+    """
+    import pandas as pd
+    from sklearn.preprocessing import StandardScaler
+
+    version = source_version(data_path)
+    target = store_dir / version
+    if (target / "manifest.json").exists():
+        _mark_current(store_dir, version)
+        return version
+
+    df = _read_source(data_path)
+    scaler = StandardScaler()
+    # Fitted on a plain array so serving can transform arrays without pandas.
+    scaled = scaler.fit_transform(df[FEATURE_COLUMNS].fillna(0).to_numpy(dtype=np.float64)).astype(np.float32)
+
+    tmp = store_dir / f".{version}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    np.save(tmp / "features.npy", scaled)
+    np.save(tmp / "missing.npy", df[FEATURE_COLUMNS].isna().to_numpy())
+    categories = {}
+    for col in CATEGORICAL_COLUMNS:
+        values = df[col].astype("string")
+        if col in LOWERCASE_COLUMNS:
+            values = values.str.lower()
+        cat = pd.Categorical(values)
+        np.save(tmp / f"codes_{col}.npy", cat.codes.astype(np.int32))
+        categories[col] = [str(c) for c in cat.categories]
+
+    with open(tmp / "scaler.pkl", "wb") as f:
+        pickle.dump(scaler, f)
+
+    manifest = {
+        "version": version,
+        "schema_version": SCHEMA_VERSION,
+        "source": str(data_path),
+        "rows": int(len(df)),
+        "feature_columns": FEATURE_COLUMNS,
+        "categories": categories,
+    }
+    with open(tmp / "manifest.json", "w") as f:
+        json.dump(manifest, f)
+
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        # Another worker finished the same build first.
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    _mark_current(store_dir, version)
+    _prune_old_builds(store_dir, keep=version)
+    print(f"✅ Built feature store {version}: {scaled.shape}")
+    return version
+
+
+def _mark_current(store_dir: Path, version: str):
+    pointer = store_dir / f".CURRENT.{os.getpid()}"
+    pointer.write_text(version)
+    os.replace(pointer, store_dir / "CURRENT")
+
+
+def _prune_old_builds(store_dir: Path, keep: str):
+    # Open memory maps keep working after unlink, so running workers are safe.
+    for entry in store_dir.iterdir():
+        if entry.is_dir() and entry.name != keep and not entry.name.startswith("."):
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+def open_feature_store(version: str, store_dir: Path = STORE_DIR):
+    path = store_dir / version
+    with open(path / "manifest.json") as f:
+        manifest = json.load(f)
+    with open(path / "scaler.pkl", "rb") as f:
+        scaler = pickle.load(f)
+
+    return FeatureStore(
+        version=manifest["version"],
+        features=np.load(path / "features.npy", mmap_mode="r"),
+        codes={col: np.load(path / f"codes_{col}.npy", mmap_mode="r") for col in CATEGORICAL_COLUMNS},
+        categories=manifest["categories"],
+        scaler=scaler,
+        missing=np.load(path / "missing.npy", mmap_mode="r"),
+    )
+
+
+def load_feature_store(data_path: Path = None, store_dir: Path = None):
+    """Open the artifact for ``data_path``, building it first if needed.
+
+    Without the source parquet the last built artifact is served as-is.
+    """
+    data_path, store_dir = data_path or DATA_PATH, store_dir or STORE_DIR
+    try:
+        if data_path.exists():
+            version = build_feature_store(data_path, store_dir)
+        elif (store_dir / "CURRENT").exists():
+            version = (store_dir / "CURRENT").read_text().strip()
+        else:
+            print("⚠️ all_crops.parquet not found — feature store empty.")
+            return empty_store()
+
+        store = open_feature_store(version, store_dir)
+        print(f"✅ Loaded feature store {store.version}: {store.features.shape}")
+        return store
+    except Exception as e:
+        print("❌ Failed to load feature store:", e)
+        return empty_store()
+
+
+def current_version(data_path: Path = None, store_dir: Path = None):
+    """Version a fresh ``load_feature_store`` would serve, from file stats only."""
+    data_path, store_dir = data_path or DATA_PATH, store_dir or STORE_DIR
+    if data_path.exists():
+        return source_version(data_path)
+    pointer = store_dir / "CURRENT"
+    return pointer.read_text().strip() if pointer.exists() else "empty"
+
+
+# ✅ Process-wide feature store, opened on first use
+feature_store_resource = LazyResource("feature_store", load_feature_store)
+get_feature_store = feature_store_resource.get
+
+# A rebuild (new source parquet, or another process moving CURRENT) is picked up
+# without a restart: at most every FEATURE_STORE_CHECK_S seconds the on-disk
+# version is compared with the last one seen, and on a change the store and
+# everything built from it (depends_on) is reset and reloaded on next use.
+FEATURE_STORE_CHECK_S = float(os.getenv("FEATURE_STORE_CHECK_S", "30"))
+_watch = {"checked_at": None, "version": None}
+
+
+def reload_if_changed():
+    """Reset the feature store if a different build is now on disk; True if it did."""
+    if not feature_store_resource.loaded:
+        return False
+    now = time.monotonic()
+    if _watch["checked_at"] is not None and now - _watch["checked_at"] < FEATURE_STORE_CHECK_S:
+        return False
+    _watch["checked_at"] = now
+    try:
+        version = current_version()
+    except OSError as e:
+        print("⚠️ Could not check the feature store version:", e)
+        return False
+
+    seen = _watch["version"] or get_feature_store().version
+    _watch["version"] = version
+    if version == seen:
+        return False
+    print(f"🔄 Feature store changed on disk ({seen} -> {version}); reloading.")
+    feature_store_resource.reset()
+    return True
+
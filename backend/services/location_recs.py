@@ -0,0 +1,80 @@
+import os
+from pathlib import Path
+
+import numpy as np
+
+from backend.services.feature_store import feature_store_resource, get_feature_store, reload_if_changed
+from backend.services.predictor import get_crop_tips
+from backend.services.resources import LazyResource
+
+# ✅ Paths
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+LOCATION_RECS_PATH = Path(os.getenv("LOCATION_RECS_PATH", BASE_DIR / "backend" / "data" / "location_recs.npz"))
+
+
+class MaterializedRecommendations:
+    """Precomputed top-N crops per indexed location row and temperature bucket.
+
+    Built offline by ``python -m backend.build_location_recs``. Bucket ``b`` holds
+    the answer for the temperature at its centre,
+    ``temp_min + (b + 0.5) * bucket_width``. Temperatures outside the built range
+    return None so the caller computes them live.
+    """
+
+    def __init__(self, path: Path, store):
+        self.available = False
+        self.bucket_width = None
+        if not path.exists():
+            print("⚠️ location_recs.npz not found — /predict-location computes live.")
+            return
+
+        data = np.load(path)
+        version = str(data["version"])
+        if version != store.version:
+            print(f"⚠️ location_recs.npz built for {version}, store is {store.version} — ignoring.")
+            return
+
+        self.temp_min = float(data["temp_min"])
+        self.bucket_width = float(data["bucket_width"])
+        self.crop_codes = data["crop_codes"]
+        self.similarity = data["similarity"]
+        self.n_buckets = self.crop_codes.shape[1]
+        self.positions = {int(row): i for i, row in enumerate(data["rows"])}
+        self.crop_names = store.categories["crop"]
+        self.available = True
+        print(f"✅ Loaded materialized recommendations: {self.crop_codes.shape}, "
+              f"{self.bucket_width}°C buckets from {self.temp_min}°C")
+
+    def lookup(self, row: int, temperature: float):
+        if not self.available:
+            return None
+        position = self.positions.get(row)
+        bucket = int(np.floor((temperature - self.temp_min) / self.bucket_width))
+        if position is None or not 0 <= bucket < self.n_buckets:
+            return None
+
+        results = []
+        for code, similarity in zip(self.crop_codes[position, bucket], self.similarity[position, bucket]):
+            if code < 0:
+                break
+            crop_name = self.crop_names[code]
+            results.append({
+                "crop": crop_name,
+                "similarity": round(float(similarity), 2),
+                "tips": get_crop_tips(crop_name)
+            })
+        return results or None
+
+
+# ✅ Optional: the app still answers live when the file is missing
+location_recs_resource = LazyResource(
+    "location_recs",
+    lambda: MaterializedRecommendations(LOCATION_RECS_PATH, get_feature_store()),
+    required=False,
+    depends_on=[feature_store_resource],
+)
+
+
+def get_location_recs():
+    reload_if_changed()
+    return location_recs_resource.get()
@@ -0,0 +1,114 @@
+import numpy as np
+
+from backend.services.feature_store import feature_store_resource, get_feature_store, reload_if_changed
+from backend.services.resources import LazyResource
+
+
+class LocationIndex:
+    """Startup-built lookup tables over the feature store's location columns.
+
+    ``/predict-location`` and ``/locations`` become dictionary lookups instead of
+    boolean-mask scans over every row. Keys are lowercased names.
+    """
+
+    def __init__(self, store):
+        self.version = store.version
+        self.exact = {}      # (state, district, season) -> first row position
+        self.fallback = {}   # (state, district) -> first row position
+        self.tree = {}       # state -> district -> sorted seasons
+        self.states = []
+        self._districts = {}  # state -> sorted districts
+        self._features = {}  # row position -> raw feature vector
+        self._missing = {}   # row position -> per-feature "value was missing" flags
+        if store.empty:
+            return
+
+        states = store.categories["state"]
+        districts = store.categories["district"]
+        seasons = store.categories["season"]
+        s = np.asarray(store.codes["state"], dtype=np.int64)
+        d = np.asarray(store.codes["district"], dtype=np.int64)
+        se = np.asarray(store.codes["season"], dtype=np.int64)
+
+        # First occurrence of every (state, district) and (state, district, season),
+        # matching the old "rows.iloc[0]" behaviour.
+        has_location = np.flatnonzero((s >= 0) & (d >= 0))
+        pair_keys = s[has_location] * len(districts) + d[has_location]
+        pairs, first = np.unique(pair_keys, return_index=True)
+        for key, row in zip(pairs, has_location[first]):
+            state_c, district_c = divmod(int(key), len(districts))
+            self.fallback[(states[state_c], districts[district_c])] = int(row)
+            self.tree.setdefault(states[state_c], {})[districts[district_c]] = []
+
+        has_season = has_location[se[has_location] >= 0]
+        triple_keys = (s[has_season] * len(districts) + d[has_season]) * len(seasons) + se[has_season]
+        triples, first = np.unique(triple_keys, return_index=True)
+        for key, row in zip(triples, has_season[first]):
+            pair_key, season_c = divmod(int(key), len(seasons))
+            state_c, district_c = divmod(pair_key, len(districts))
+            state, district, season = states[state_c], districts[district_c], seasons[season_c]
+            self.exact[(state, district, season)] = int(row)
+            self.tree[state][district].append(season)
+
+        for district_map in self.tree.values():
+            for season_list in district_map.values():
+                season_list.sort()
+        self.states = sorted(self.tree)
+        self._districts = {state: sorted(district_map) for state, district_map in self.tree.items()}
+
+        rows = sorted(set(self.exact.values()) | set(self.fallback.values()))
+        for row, values in zip(rows, store.raw_features(rows)):
+            self._features[row] = [float(v) for v in values]
+            self._missing[row] = [bool(m) for m in store.missing[row]]
+        print(f"✅ Built location index: {len(self.exact)} locations, {len(self.fallback)} districts")
+
+    @property
+    def empty(self):
+        return not self.fallback
+
+    def match(self, state: str, district: str, season: str):
+        """(row position, exact) for the location; exact is False for a state+district fallback.
+
+        Returns (None, False) when the district is unknown.
+        """
+        state, district, season = state.strip().lower(), district.strip().lower(), season.strip().lower()
+        row = self.exact.get((state, district, season))
+        if row is not None:
+            return row, True
+        return self.fallback.get((state, district)), False
+
+    def lookup_row(self, state: str, district: str, season: str):
+        """Row position for the location, falling back to state+district only."""
+        return self.match(state, district, season)[0]
+
+    def features(self, row: int):
+        """Raw [N, P, K, temperature, ph, rainfall] of an indexed row (missing values read 0)."""
+        return self._features[row]
+
+    def value(self, row: int, column: int):
+        """Raw feature ``column`` of an indexed row, or None if the source value was missing."""
+        return None if self._missing[row][column] else self._features[row][column]
+
+    def districts(self, state: str):
+        return self._districts.get(state.strip().lower(), [])
+
+    def seasons(self, district: str, state: str = None):
+        district = district.strip().lower()
+        if state is not None:
+            return self.tree.get(state.strip().lower(), {}).get(district, [])
+        # Without a state, district names that repeat across states are merged.
+        merged = set()
+        for district_map in self.tree.values():
+            merged.update(district_map.get(district, []))
+        return sorted(merged)
+
+
+# ✅ Process-wide location index, built on first use
+location_index_resource = LazyResource(
+    "location_index", lambda: LocationIndex(get_feature_store()), depends_on=[feature_store_resource]
+)
+
+
+def get_location_index():
+    reload_if_changed()
+    return location_index_resource.get()
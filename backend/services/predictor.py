@@ -1,55 +1,142 @@
-import json
-import pandas as pd
-import pickle
-from pathlib import Path
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics.pairwise import euclidean_distances
-
-# ✅ Paths
-BASE_DIR = Path(__file__).resolve().parent.parent.parent
-DATA_PATH = BASE_DIR / "backend" / "data" / "all_crops.parquet"
-
-# ✅ Load dataset
-try:
-    crop_df = pd.read_parquet(DATA_PATH)
-    print("✅ Loaded Parquet dataset:", crop_df.shape)
-except FileNotFoundError:
-    print("❌ Parquet dataset not found.")
-    crop_df = pd.DataFrame()
+import os
+import numpy as np
+
+from backend.services.cache import TTLCache
+from backend.services.feature_store import FEATURE_COLUMNS, feature_store_resource, get_feature_store, reload_if_changed
+from backend.services.resources import LazyResource
 
 # ✅ Column mapping: user input → dataset columns
 # Order of user_input = [N, P, K, temperature, ph, rainfall]
-feature_mapping = {
-    "N": "N_kg_ha",
-    "P": "P_kg_ha",
-    "K": "K_kg_ha",
-    "temperature": "avg_temp_C",
-    "ph": "soil_ph",
-    "rainfall": "avg_rainfall_mm"
-}
+feature_mapping = dict(zip(["N", "P", "K", "temperature", "ph", "rainfall"], FEATURE_COLUMNS))
 
 # ✅ Build aligned feature list (dataset column names)
-dataset_feature_cols = list(feature_mapping.values())
+dataset_feature_cols = FEATURE_COLUMNS
 label_col = "crop"
 
-# ✅ Initialize scaler and scale dataset
-if not crop_df.empty:
-    try:
-        scaler = StandardScaler()
-        crop_features = crop_df[dataset_feature_cols].fillna(0)
-        scaled_values = scaler.fit_transform(crop_features)
 
-        crop_df_scaled = crop_df.copy()
-        crop_df_scaled[dataset_feature_cols] = scaled_values
-    except Exception as e:
-        print("❌ Failed to scale dataset:", e)
-        scaler = StandardScaler()
-        crop_df_scaled = pd.DataFrame(columns=dataset_feature_cols + [label_col])
-else:
-    scaler = StandardScaler()
-    crop_df_scaled = pd.DataFrame(columns=dataset_feature_cols + [label_col])
+# ✅ k-NN index over the memory-mapped scaled matrix
+class CropIndex:
+    """KD-tree over the scaled feature matrix plus what is needed to label matches.
+
+    The tree answers exact nearest-neighbour queries in ~O(log rows), so a
+    request never copies or scans the whole dataset. Rows without a crop label
+    (code -1) are left out of the tree, so they can never be recommended.
+    """
+
+    def __init__(self, features, crop_codes, crop_names, scaler, version):
+        from sklearn.neighbors import KDTree
+
+        self.version = version
+        self.scaler = scaler
+        self.crop_codes = crop_codes
+        self.crop_names = np.asarray(crop_names, dtype=object)
+
+        # Tree position -> store row, only when some rows had to be dropped.
+        self._rows = None
+        labelled = np.flatnonzero(np.asarray(crop_codes) >= 0)
+        if len(labelled) < len(crop_codes):
+            print(f"⚠️ {len(crop_codes) - len(labelled)} rows without a crop left out of the k-NN index")
+            self._rows = labelled
+            features = np.asarray(features)[labelled]
+        self.tree = KDTree(features) if len(features) else None
+
+    @classmethod
+    def from_store(cls, store):
+        return cls(store.features, store.codes[label_col], store.categories[label_col], store.scaler, store.version)
+
+    @property
+    def empty(self):
+        return self.tree is None
+
+    def transform(self, inputs):
+        """Scale raw [N, P, K, temperature, ph, rainfall] rows."""
+        return self.scaler.transform(np.asarray(inputs, dtype=np.float64).reshape(-1, len(dataset_feature_cols)))
+
+    def query_nearest(self, input_scaled, top_n=5):
+        """Return (distances, row indices) of the top_n rows nearest to each input row.
+
+        Ordering matches the old brute-force ``nsmallest`` scan: ascending distance,
+        with ties broken by the lower dataset row position.
+        """
+        k = min(top_n, self.tree.data.shape[0])
+        kth_distances, _ = self.tree.query(input_scaled, k=k)
+
+        # Pull every row tied with the k-th distance so tie-breaking is by position
+        # rather than by tree traversal order.
+        radius = np.nextafter(kth_distances[:, -1], np.inf)
+        candidates, candidate_distances = self.tree.query_radius(
+            input_scaled, r=radius, return_distance=True
+        )
+
+        distances = np.empty((len(input_scaled), k))
+        indices = np.empty((len(input_scaled), k), dtype=np.intp)
+        for i, (rows, dists) in enumerate(zip(candidates, candidate_distances)):
+            if self._rows is not None:
+                rows = self._rows[rows]
+            order = np.lexsort((rows, dists))[:k]
+            distances[i] = dists[order]
+            indices[i] = rows[order]
+        return distances, indices
+
+    def format_matches(self, distances, indices):
+        results = []
+        for distance, idx in zip(distances, indices):
+            crop_name = self.crop_names[self.crop_codes[idx]]
+            tips = get_crop_tips(crop_name)
+            results.append({
+                "crop": crop_name,
+                "similarity": round(100 - distance * 100, 2),
+                "tips": tips
+            })
+        return results
+
+
+def _build_crop_index():
+    index = CropIndex.from_store(get_feature_store())
+    if not index.empty:
+        print("✅ Built KD-tree index:", index.tree.data.shape)
+    return index
+
+crop_index_resource = LazyResource("crop_index", _build_crop_index, depends_on=[feature_store_resource])
+
 
-print("✅ Columns after renaming:", crop_df.columns.tolist())
+def get_crop_index():
+    """The k-NN index, rebuilt once a new feature store build shows up on disk."""
+    reload_if_changed()
+    return crop_index_resource.get()
+
+
+# ✅ Result cache in front of the k-NN lookup
+# Inputs are snapped to per-feature resolutions (CROP_CACHE_RESOLUTION, e.g.
+# "N=1,ph=0.1,rainfall=5"; 0 disables snapping) before both lookup and compute,
+# so every input in a bucket gets the same answer.
+DEFAULT_RESOLUTIONS = {"N": 1, "P": 1, "K": 1, "temperature": 0.5, "ph": 0.1, "rainfall": 1}
+
+def _parse_resolutions(spec: str):
+    resolutions = dict(DEFAULT_RESOLUTIONS)
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, value = part.split("=")
+        resolutions[name.strip()] = float(value)
+    return [resolutions[name] for name in feature_mapping]
+
+input_resolutions = _parse_resolutions(os.getenv("CROP_CACHE_RESOLUTION", ""))
+recommendation_cache = TTLCache(
+    max_entries=int(os.getenv("CROP_CACHE_MAX_ENTRIES", "50000")),
+    max_bytes=int(float(os.getenv("CROP_CACHE_MAX_MB", "64")) * 1024 * 1024),
+    ttl=float(os.getenv("CROP_CACHE_TTL_S", "3600")) or None,
+    name="crop_recommendations",
+)
+
+def quantize_input(user_input):
+    snapped = []
+    for value, resolution in zip(user_input, input_resolutions):
+        value = 0.0 if value is None else float(value)
+        if value != value:  # NaN, treated as 0 like missing dataset values
+            value = 0.0
+        if resolution > 0:
+            value = round(round(value / resolution) * resolution, 6)
+        snapped.append(value)
+    return tuple(snapped)
 
 
 # ✅ Crop care tips
@@ -110,49 +197,67 @@ def get_crop_tips(crop_name: str):
 
 # ✅ Suggest top crops
 def get_top_matching_crops(user_input: list, top_n=5):
-    if crop_df_scaled.empty:
-        print("❌ Dataset empty")
-        return []
-
     try:
-        # Map user input → dataset column names
-        input_dict = {
-            "N_kg_ha": user_input[0],
-            "P_kg_ha": user_input[1],
-            "K_kg_ha": user_input[2],
-            "avg_temp_C": user_input[3],
-            "soil_ph": user_input[4],
-            "avg_rainfall_mm": user_input[5]
-        }
-        print("🔍 User input mapped:", input_dict)
-
-        input_df = pd.DataFrame([input_dict], columns=dataset_feature_cols).fillna(0)
-        print("✅ Input DataFrame:", input_df.to_dict(orient="records"))
+        index = get_crop_index()
+        if index.empty:
+            print("❌ Dataset empty")
+            return []
 
-        input_scaled = scaler.transform(input_df)
-        print("✅ Scaled input:", input_scaled)
+        user_input = quantize_input(user_input)
+        cache_key = (top_n, user_input)
+        recommendation_cache.bind_version(index.version)
+        cached = recommendation_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
 
-        df_copy = crop_df_scaled.copy()
-        data_scaled = df_copy[dataset_feature_cols].values
-        distances = euclidean_distances(data_scaled, input_scaled).flatten()
-        df_copy["distance"] = distances
+        print("🔍 User input mapped:", dict(zip(dataset_feature_cols, user_input)))
 
-        top_matches = df_copy.nsmallest(top_n, "distance")
+        input_scaled = index.transform(user_input)
+        print("✅ Scaled input:", input_scaled)
 
-        results = []
-        for _, row in top_matches.iterrows():
-            crop_name = row[label_col]
-            tips = get_crop_tips(crop_name)
-            results.append({
-                "crop": crop_name,
-                "similarity": round(100 - row["distance"] * 100, 2),
-                "tips": tips
-            })
+        distances, indices = index.query_nearest(input_scaled, top_n)
+        results = index.format_matches(distances[0], indices[0])
 
         print("✅ Top results:", results)
-        return results
+        if results:
+            recommendation_cache.set(cache_key, results)
+        return list(results)
 
     except Exception as e:
         print("❌ get_top_matching_crops error:", e)
         return []
 
+
+# ✅ Suggest top crops for many inputs at once
+BATCH_CHUNK_SIZE = 1024
+
+def get_top_matching_crops_batch(user_inputs: list, top_n=5):
+    """Top crops for each row of ``user_inputs`` ([N, P, K, temperature, ph, rainfall]).
+
+    Cached rows are answered from the result cache; the rest are scaled in one
+    ``scaler.transform`` call and queried against the index in chunks, so
+    thousands of samples cost one pass instead of one request each.
+    """
+    index = get_crop_index()
+    if index.empty or len(user_inputs) == 0:
+        return [[] for _ in user_inputs]
+
+    recommendation_cache.bind_version(index.version)
+    keys = [(top_n, quantize_input(values)) for values in user_inputs]
+    results = [recommendation_cache.get(key) for key in keys]
+
+    # Compute each distinct missing bucket once, even if it repeats in the batch
+    misses = list(dict.fromkeys(key for key, cached in zip(keys, results) if cached is None))
+    if misses:
+        input_scaled = index.transform([key[1] for key in misses])
+
+        computed = {}
+        for start in range(0, len(input_scaled), BATCH_CHUNK_SIZE):
+            distances, indices = index.query_nearest(input_scaled[start:start + BATCH_CHUNK_SIZE], top_n)
+            for key, d, i in zip(misses[start:start + BATCH_CHUNK_SIZE], distances, indices):
+                computed[key] = index.format_matches(d, i)
+                recommendation_cache.set(key, computed[key])
+
+        results = [computed[key] if cached is None else cached for key, cached in zip(keys, results)]
+
+    return [list(matches) for matches in results]
@@ -0,0 +1,79 @@
+import threading
+import time
+
+_registry = {}
+
+
+class LazyResource:
+    """Thread-safe singleton that runs ``loader`` on first ``get()``.
+
+    A failed load is recorded (see ``status()``) and retried on the next call
+    instead of leaving a half-initialized global behind. Resources listed in
+    ``depends_on`` reset this one when they are reset themselves.
+    """
+
+    def __init__(self, name: str, loader, required: bool = True, depends_on=()):
+        self.name = name
+        self.loader = loader
+        self.required = required
+        self._dependents = []
+        for resource in depends_on:
+            resource._dependents.append(self)
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.load_seconds = None
+        self.error = None
+        _registry[name] = self
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get(self):
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                start = time.perf_counter()
+                try:
+                    self._value = self.loader()
+                except Exception as e:
+                    self.error = f"{type(e).__name__}: {e}"
+                    raise
+                self.load_seconds = round(time.perf_counter() - start, 3)
+                self.error = None
+                self._loaded = True
+        return self._value
+
+    def set(self, value):
+        """Install a prebuilt value (benchmarks, offline tools)."""
+        with self._lock:
+            self._value = value
+            self._loaded = True
+            self.error = None
+
+    def reset(self):
+        """Drop the value (and that of every dependent) so the next ``get()`` reloads it."""
+        with self._lock:
+            self._value = None
+            self._loaded = False
+        for resource in self._dependents:
+            resource.reset()
+
+    def status(self):
+        return {
+            "loaded": self._loaded,
+            "required": self.required,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
+
+
+def resource_status():
+    """Status of every registered resource, keyed by name."""
+    return {name: resource.status() for name, resource in _registry.items()}
+
+
+def all_required_loaded():
+    return all(r.loaded for r in _registry.values() if r.required)
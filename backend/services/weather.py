@@ -1,22 +1,98 @@
-import requests
+import asyncio
 import os
+import random
+
+import httpx
 from dotenv import load_dotenv
+
+from backend.services.cache import TTLCache
+
 load_dotenv()
 
 WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", "a1ebb70e1acc402d941200642250207")  # replace or load securely
+# Point at a local stand-in server in tests, e.g. http://127.0.0.1:8081/v1
+WEATHER_API_BASE_URL = os.getenv("WEATHER_API_BASE_URL", "http://api.weatherapi.com/v1").rstrip("/")
 
+# ✅ Upstream client settings
+WEATHER_TIMEOUT_S = float(os.getenv("WEATHER_TIMEOUT_S", "5"))
+WEATHER_CONNECT_TIMEOUT_S = float(os.getenv("WEATHER_CONNECT_TIMEOUT_S", "2"))
+WEATHER_RETRIES = int(os.getenv("WEATHER_RETRIES", "2"))
+WEATHER_BACKOFF_S = float(os.getenv("WEATHER_BACKOFF_S", "0.2"))
+WEATHER_MAX_CONNECTIONS = int(os.getenv("WEATHER_MAX_CONNECTIONS", "20"))
 
-async def get_weather_data(lat: float, lon: float):
-    API_KEY = os.getenv("WEATHER_API_KEY", "a1ebb70e1acc402d941200642250207")
-    url = f"http://api.weatherapi.com/v1/current.json?key={API_KEY}&q={lat},{lon}&aqi=no"
-    
-    print("Weather API URL:", url)  # ✅ NOW it's safe — inside the function
+# ✅ Cache: one entry per grid cell (WEATHER_GRID_DEG=0.1 is roughly 11 km)
+WEATHER_GRID_DEG = float(os.getenv("WEATHER_GRID_DEG", "0.1"))
+weather_cache = TTLCache(
+    max_entries=int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "10000")),
+    ttl=float(os.getenv("WEATHER_CACHE_TTL_S", "600")) or None,
+    name="weather",
+)
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class WeatherError(Exception):
+    """Upstream answered with an error or could not be reached."""
+
+
+_client = None
+_inflight = {}
+counters = {"upstream_calls": 0, "retries": 0, "coalesced": 0}
+
+
+def get_client():
+    """Shared AsyncClient, so connections to the upstream are pooled and reused."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=WEATHER_API_BASE_URL,
+            timeout=httpx.Timeout(WEATHER_TIMEOUT_S, connect=WEATHER_CONNECT_TIMEOUT_S),
+            limits=httpx.Limits(max_connections=WEATHER_MAX_CONNECTIONS,
+                                max_keepalive_connections=WEATHER_MAX_CONNECTIONS),
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
 
-    response = requests.get(url)
-    data = response.json()
 
+def grid_cell(lat: float, lon: float):
+    """Snap coordinates to the cache grid; the upstream is queried at the snapped point."""
+    lat, lon = float(lat), float(lon)
+    if WEATHER_GRID_DEG > 0:
+        lat = round(round(lat / WEATHER_GRID_DEG) * WEATHER_GRID_DEG, 6)
+        lon = round(round(lon / WEATHER_GRID_DEG) * WEATHER_GRID_DEG, 6)
+    return lat, lon
+
+
+async def _request(lat: float, lon: float):
+    params = {"key": os.getenv("WEATHER_API_KEY", WEATHER_API_KEY), "q": f"{lat},{lon}", "aqi": "no"}
+    for attempt in range(WEATHER_RETRIES + 1):
+        counters["upstream_calls"] += 1
+        try:
+            response = await get_client().get("/current.json", params=params)
+            if response.status_code not in RETRY_STATUS:
+                break
+            error = WeatherError(f"Weather API returned {response.status_code}")
+        except httpx.TransportError as e:
+            error = WeatherError(f"Weather API unreachable: {type(e).__name__}")
+
+        if attempt == WEATHER_RETRIES:
+            raise error
+        counters["retries"] += 1
+        # Exponential backoff with full jitter, so retries from many workers spread out.
+        await asyncio.sleep(random.uniform(0, WEATHER_BACKOFF_S * 2 ** attempt))
+
+    try:
+        data = response.json()
+    except ValueError:
+        raise WeatherError(f"Weather API returned {response.status_code} with a non-JSON body")
     if response.status_code != 200 or "error" in data:
-        raise Exception(data.get("error", {}).get("message", "Weather API Error"))
+        raise WeatherError(data.get("error", {}).get("message", "Weather API Error"))
 
     return {
         "location": data["location"]["name"],
@@ -28,3 +104,32 @@ async def get_weather_data(lat: float, lon: float):
         "condition": data["current"]["condition"]["text"],
         "icon": data["current"]["condition"]["icon"]
     }
+
+
+async def _fetch_cell(cell):
+    result = await _request(*cell)
+    weather_cache.set(cell, result)
+    return result
+
+
+async def get_weather_data(lat: float, lon: float):
+    cell = grid_cell(lat, lon)
+    cached = weather_cache.get(cell)
+    if cached is not None:
+        return dict(cached)
+
+    # Concurrent callers for the same cell share one upstream request.
+    task = _inflight.get(cell)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_cell(cell))
+        _inflight[cell] = task
+        task.add_done_callback(lambda _: _inflight.pop(cell, None))
+    else:
+        counters["coalesced"] += 1
+
+    # shield: one caller timing out or disconnecting must not cancel the others.
+    return dict(await asyncio.shield(task))
+
+
+def stats():
+    return {**weather_cache.stats(), **counters, "in_flight": len(_inflight), "grid_deg": WEATHER_GRID_DEG}
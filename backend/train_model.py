@@ -1,69 +1,180 @@
-import pandas as pd
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-import pickle
+"""Train the crop recommendation model on all_crops.parquet.
+
+    python -m backend.train_model                        # all rows
+    python -m backend.train_model --sample-per-crop 20000
+
+Only the six feature columns and the crop label are read, as float32. With
+--sample-per-crop the source is streamed in record batches and each crop keeps
+a uniform reservoir sample of that size, so memory stays bounded by the sample
+rather than the file. Training time, peak memory and held-out accuracy are
+written to crop_recommendation_metrics.json next to the model.
+
+Missing feature values are filled with training-set medians by the saved
+preprocessor, so serving fills them exactly the same way.
+"""
+import argparse
+import json
 import os
+import pickle
+import resource
+import time
+from pathlib import Path
 
+import numpy as np
 from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
 
-model = HistGradientBoostingClassifier(
-    max_iter=100,     # number of boosting rounds
-    max_depth=15,     # limit depth to control memory
-    random_state=42
+from backend.services.feature_store import (
+    DATA_PATH, FEATURE_COLUMNS, open_source, resolve_columns, source_version
 )
 
-
-
 # ✅ Paths
-DATA_PATH = "backend/data/all_crops.parquet"   # merged dataset
 MODEL_DIR = "backend/model"
-
-if not os.path.exists(DATA_PATH):
-    raise FileNotFoundError(f"❌ Dataset not found at {DATA_PATH}")
-
-# ✅ Load dataset
-df = pd.read_parquet(DATA_PATH)
-print(f"✅ Loaded dataset: {df.shape}")
-
-df = pd.read_parquet("backend/data/all_crops.parquet")
-
-# Rename columns to match feature_cols
-df = df.rename(columns={
-    "N_kg_ha": "N",
-    "P_kg_ha": "P",
-    "K_kg_ha": "K",
-    "avg_temp_C": "temperature",
-    "avg_rainfall_mm": "rainfall",
-    "soil_ph": "ph",
-    "crop": "label"   # if you're using crop as target
-})
-
-print("✅ Columns after renaming:", df.columns.tolist())
-
-# ✅ Feature / label split
-# Assumption: your dataset has columns ['N','P','K','temperature','humidity','ph','rainfall','label']
-feature_cols = ['N', 'P', 'K', 'temperature', 'ph', 'rainfall']
-label_col = 'label'
-df_small = df.sample(n=300000, random_state=42)
-X = df[feature_cols]
-y = df[label_col]
-
-# ✅ Train-test split & scaling
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-
-# ✅ Train Random Forest
-model = HistGradientBoostingClassifier(max_iter=100, max_depth=15, random_state=42)
-model.fit(X_train_scaled, y_train)
-
-# ✅ Save model + scaler
-os.makedirs(MODEL_DIR, exist_ok=True)
-
-with open(os.path.join(MODEL_DIR, "crop_recommendation.pkl"), "wb") as f:
-    pickle.dump(model, f)
-
-with open(os.path.join(MODEL_DIR, "preprocessor.pkl"), "wb") as f:
-    pickle.dump(scaler, f)
-
-print("🎉 Model and Preprocessor saved successfully to 'backend/model/'")
+LABEL_COLUMN = "crop"
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_preprocessor():
+    """Median imputation then scaling; saved as preprocessor.pkl and applied unchanged at serving."""
+    return make_pipeline(SimpleImputer(strategy="median", keep_empty_features=True), StandardScaler())
+
+
+def _batch_arrays(batch, columns):
+    """float32 (n, 6) features and object crop names from one record batch / table."""
+    X = np.column_stack([
+        batch.column(columns[col]).to_numpy(zero_copy_only=False).astype(np.float32, copy=False)
+        for col in FEATURE_COLUMNS
+    ])
+    y = batch.column(columns[LABEL_COLUMN]).to_numpy(zero_copy_only=False)
+    return X, y
+
+
+def load_all(dataset, columns):
+    table = dataset.to_table(columns=list(columns.values()))
+    return _batch_arrays(table, columns)
+
+
+def load_sample_per_crop(dataset, columns, per_crop: int, seed: int, batch_size: int):
+    """Uniform per-crop reservoir sample (Algorithm R) over streamed record batches."""
+    rng = np.random.default_rng(seed)
+    reservoirs, seen = {}, {}
+
+    for batch in dataset.to_batches(columns=list(columns.values()), batch_size=batch_size):
+        X, y = _batch_arrays(batch, columns)
+        keep = np.array([v is not None for v in y], dtype=bool)
+        crops, inverse = np.unique(y[keep].astype(str), return_inverse=True)
+        X = X[keep]
+        for code, crop in enumerate(crops):
+            rows = X[inverse == code]
+            sample = reservoirs.setdefault(crop, np.empty((0, len(FEATURE_COLUMNS)), dtype=np.float32))
+            n_seen = seen.get(crop, 0)
+
+            # Fill the reservoir first, then row t (1-based) replaces slot j < per_crop with p = per_crop / t.
+            fill = min(per_crop - len(sample), len(rows))
+            if fill > 0:
+                sample = np.concatenate([sample, rows[:fill]])
+            rest = rows[fill:]
+            if len(rest):
+                positions = n_seen + fill + np.arange(1, len(rest) + 1)
+                slots = (rng.random(len(rest)) * positions).astype(np.int64)
+                hit = slots < per_crop
+                sample[slots[hit]] = rest[hit]
+
+            reservoirs[crop] = sample
+            seen[crop] = n_seen + len(rows)
+
+    crops = sorted(reservoirs)
+    X = np.concatenate([reservoirs[c] for c in crops]) if crops else np.empty((0, len(FEATURE_COLUMNS)), np.float32)
+    y = np.concatenate([np.full(len(reservoirs[c]), c, dtype=object) for c in crops]) if crops else np.empty(0, object)
+    return X, y, int(sum(seen.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default=str(DATA_PATH))
+    parser.add_argument("--sample-per-crop", type=int, default=int(os.getenv("CROP_TRAIN_SAMPLE_PER_CROP", "0")),
+                        help="stream the source and keep at most this many rows per crop (0 = all rows)")
+    parser.add_argument("--batch-size", type=int, default=65536, help="rows per streamed record batch")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--max-iter", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.data):
+        raise FileNotFoundError(f"❌ Dataset not found at {args.data}")
+
+    # ✅ Load only the feature + label columns
+    start = time.perf_counter()
+    dataset = open_source(args.data)
+    columns = resolve_columns(dataset.schema.names, FEATURE_COLUMNS + [LABEL_COLUMN])
+    if args.sample_per_crop > 0:
+        X, y, rows_read = load_sample_per_crop(dataset, columns, args.sample_per_crop, args.seed, args.batch_size)
+    else:
+        X, y = load_all(dataset, columns)
+        keep = np.array([v is not None for v in y], dtype=bool)
+        X, y = X[keep], y[keep].astype(str).astype(object)
+        rows_read = int(len(keep))
+    load_seconds = time.perf_counter() - start
+    print(f"✅ Loaded {len(X)} of {rows_read} rows ({X.nbytes / 1e6:.1f} MB features) in {load_seconds:.1f}s")
+
+    # ✅ Stratified train-test split, imputation & scaling
+    _, counts = np.unique(y, return_counts=True)
+    stratify = y if counts.min() >= 2 else None
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=args.test_size, random_state=args.seed, stratify=stratify
+    )
+    del X, y
+    missing_train = int(np.isnan(X_train).sum())
+    scaler = make_preprocessor()
+    X_train_scaled = scaler.fit_transform(X_train)
+
+    # ✅ Train
+    model = HistGradientBoostingClassifier(max_iter=args.max_iter, max_depth=args.max_depth, random_state=args.seed)
+    start = time.perf_counter()
+    model.fit(X_train_scaled, y_train)
+    fit_seconds = time.perf_counter() - start
+    accuracy = float(model.score(scaler.transform(X_test), y_test))
+    print(f"✅ Trained in {fit_seconds:.1f}s, held-out accuracy {accuracy:.4f}")
+
+    # ✅ Save model + scaler + metrics
+    os.makedirs(MODEL_DIR, exist_ok=True)
+
+    with open(os.path.join(MODEL_DIR, "crop_recommendation.pkl"), "wb") as f:
+        pickle.dump(model, f)
+
+    with open(os.path.join(MODEL_DIR, "preprocessor.pkl"), "wb") as f:
+        pickle.dump(scaler, f)
+
+    metrics = {
+        "source": str(args.data),
+        "source_version": source_version(Path(args.data)),
+        "feature_columns": FEATURE_COLUMNS,
+        "sample_per_crop": args.sample_per_crop,
+        "rows_read": rows_read,
+        "train_rows": int(len(X_train)),
+        "test_rows": int(len(X_test)),
+        "missing_values_imputed": missing_train,
+        "imputed_medians": dict(zip(FEATURE_COLUMNS, map(float, scaler[0].statistics_))),
+        "classes": int(len(model.classes_)),
+        "stratified": stratify is not None,
+        "load_seconds": round(load_seconds, 2),
+        "fit_seconds": round(fit_seconds, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "holdout_accuracy": round(accuracy, 4),
+    }
+    with open(os.path.join(MODEL_DIR, "crop_recommendation_metrics.json"), "w") as f:
+        json.dump(metrics, f, indent=2)
+
+    print(json.dumps(metrics, indent=2))
+    print("🎉 Model, Preprocessor and metrics saved successfully to 'backend/model/'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import asyncio
+
+from backend.services.batching import MicroBatcher
+
+
+def test_every_submission_resolves_in_order():
+    batcher = MicroBatcher(lambda items: [i * 2 for i in items], max_batch_size=8, max_wait_ms=1.0)
+
+    async def main():
+        results = []
+        for _ in range(20):
+            # Bursts and stragglers around the flush deadline.
+            results += await asyncio.gather(*(batcher.submit(i) for i in range(37)))
+            await asyncio.sleep(0.001)
+        return results
+
+    results = asyncio.run(main())
+    assert results == [i * 2 for i in range(37)] * 20
+    assert batcher.items == 37 * 20
+    assert max(int(size) for size in batcher.stats()["batch_size_histogram"]) <= 8
+
+
+def test_stragglers_within_the_wait_window_share_a_batch():
+    batcher = MicroBatcher(lambda items: items, max_batch_size=16, max_wait_ms=50.0)
+
+    async def main():
+        first = asyncio.ensure_future(batcher.submit("a"))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(batcher.submit("b"))
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(main()) == ["a", "b"]
+    assert batcher.batches == 1
+
+
+def test_batch_errors_reach_every_caller():
+    def fail(items):
+        raise RuntimeError("model crashed")
+
+    batcher = MicroBatcher(fail, max_batch_size=4, max_wait_ms=1.0)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_wrong_result_count_fails_every_caller():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=4, max_wait_ms=5.0)
+
+    async def main():
+        calls = asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+        return await asyncio.wait_for(calls, 1.0)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) and "2 results for 3 items" in str(r) for r in results)
@@ -0,0 +1,21 @@
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier
+
+from backend.services.crop_model import CropModel
+from backend.train_model import make_preprocessor
+
+
+def test_missing_inputs_are_filled_with_training_medians():
+    rng = np.random.default_rng(0)
+    X = rng.normal([90, 40, 40, 25, 6.5, 200], [20, 10, 10, 5, 0.5, 50], (200, 6))
+    y = np.where(X[:, 0] > 90, "rice", "maize")
+    X[rng.random(X.shape) < 0.1] = np.nan
+
+    preprocessor = make_preprocessor()
+    model = HistGradientBoostingClassifier(max_iter=20, random_state=0).fit(preprocessor.fit_transform(X), y)
+    crop_model = CropModel(model, preprocessor, "t")
+
+    medians = np.nanmedian(X, axis=0)
+    with_gaps = [[None, 40, 40, float("nan"), 6.5, 200]]
+    filled = [[medians[0], 40, 40, medians[3], 6.5, 200]]
+    assert crop_model.predict_top(with_gaps) == crop_model.predict_top(filled)
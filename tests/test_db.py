@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import StaticPool
+
+from backend.database import db
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("sqlite:///./community.db", "sqlite+aiosqlite:///./community.db"),
+    ("sqlite://", "sqlite+aiosqlite://"),
+    ("postgresql://u:p@host/farmiq", "postgresql+asyncpg://u:p@host/farmiq"),
+    ("postgresql+psycopg2://u:p@host:5433/farmiq", "postgresql+asyncpg://u:p@host:5433/farmiq"),
+    ("mysql+pymysql://u:p@host/farmiq", "mysql+pymysql://u:p@host/farmiq"),
+])
+def test_async_url_swaps_the_driver(url, expected):
+    assert db.async_url(url).render_as_string(hide_password=False) == expected
+
+
+def test_libpq_params_are_mapped_for_asyncpg():
+    url = ("postgresql+psycopg2://u:p@host/farmiq?sslmode=verify-full&connect_timeout=5"
+           "&application_name=farmiq&keepalives=1&prepared_statement_cache_size=0")
+    assert dict(db.async_url(url).query) == {"prepared_statement_cache_size": "0"}
+    assert db.async_connect_args(url) == {
+        "ssl": "verify-full",
+        "timeout": 5.0,
+        "server_settings": {"application_name": "farmiq"},
+    }
+
+
+def test_certificate_params_are_refused():
+    with pytest.raises(ValueError, match="sslrootcert"):
+        db.async_connect_args("postgresql://u:p@host/farmiq?sslmode=verify-ca&sslrootcert=/etc/ca.pem")
+
+
+def test_sqlite_urls_need_no_connect_args():
+    assert db.async_connect_args("sqlite:///./community.db?timeout=1") == {}
+
+
+def test_engine_options_per_backend():
+    memory = db._engine_options(make_url("sqlite://"))
+    assert memory["poolclass"] is StaticPool
+
+    file_options = db._engine_options(make_url("sqlite:///./community.db"))
+    assert file_options["pool_size"] == db.DB_POOL_SIZE
+    assert "pool_pre_ping" not in file_options
+
+    for url in ("postgresql://u:p@host/farmiq", "postgresql+psycopg2://u:p@host/farmiq",
+                "postgresql+asyncpg://u:p@host/farmiq"):
+        options = db._engine_options(make_url(url))
+        assert options["pool_pre_ping"] is True
+        assert options["pool_recycle"] == db.DB_POOL_RECYCLE_S
+        assert "connect_args" not in options
+
+
+def test_async_sqlite_engine_runs_queries(tmp_path):
+    engine = db.create_async_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+
+    async def main():
+        try:
+            async with engine.connect() as conn:
+                return (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(main()) == "wal"
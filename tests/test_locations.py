@@ -0,0 +1,50 @@
+import math
+
+import pandas as pd
+import pytest
+
+from backend.services.feature_store import build_feature_store, open_feature_store
+from backend.services.locations import LocationIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    source = tmp_path / "all_crops.parquet"
+    pd.DataFrame({
+        "state": ["Punjab", "Punjab", "Punjab"],
+        "district": ["Ludhiana", "Ludhiana", "Amritsar"],
+        "season": ["Kharif", "Rabi", "Kharif"],
+        "crop": ["rice", "wheat", None],
+        "N_kg_ha": [90.0, 80.0, 70.0],
+        "P_kg_ha": [40.0, 35.0, 30.0],
+        "K_kg_ha": [40.0, 30.0, 20.0],
+        "avg_temp_C": [31.0, 18.0, None],
+        "soil_ph": [6.5, 7.0, 7.2],
+        "avg_rainfall_mm": [700.0, 80.0, 650.0],
+    }).to_parquet(source)
+    store_dir = tmp_path / "store"
+    version = build_feature_store(source, store_dir)
+    return LocationIndex(open_feature_store(version, store_dir))
+
+
+def test_exact_match_reports_recorded_temperature(index):
+    row, exact = index.match("punjab", "ludhiana", "rabi")
+    assert exact
+    assert index.value(row, 3) == pytest.approx(18.0)
+
+
+def test_season_fallback_is_not_exact(index):
+    row, exact = index.match("Punjab", "Ludhiana", "Zaid")
+    assert row == index.lookup_row("Punjab", "Ludhiana", "Kharif")
+    assert not exact
+
+
+def test_missing_temperature_is_none_not_zero(index):
+    row, exact = index.match("punjab", "amritsar", "kharif")
+    assert exact
+    assert index.value(row, 3) is None
+    assert not math.isnan(index.features(row)[3])
+
+
+def test_unknown_district(index):
+    assert index.match("punjab", "nowhere", "kharif") == (None, False)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from backend.services import feature_store, predictor
+from backend.services.predictor import CropIndex
+
+
+def _index(codes):
+    raw = np.array([
+        [90, 40, 40, 25, 6.5, 200],
+        [91, 41, 41, 25, 6.5, 201],
+        [10, 10, 10, 15, 4.5, 50],
+        [90, 40, 40, 25, 6.5, 200],
+    ], dtype=np.float64)
+    scaler = StandardScaler().fit(raw)
+    return CropIndex(scaler.transform(raw), np.array(codes, dtype=np.int32), ["maize", "rice"], scaler, "t")
+
+
+def test_rows_without_a_crop_are_never_matched():
+    # Row 0 is an exact match but has no crop (code -1); it used to come back as crop_names[-1].
+    index = _index([-1, 0, 0, 1])
+    distances, indices = index.query_nearest(index.transform([[90, 40, 40, 25, 6.5, 200]]), 3)
+    assert -1 not in index.crop_codes[indices[0]]
+    assert list(indices[0]) == [3, 1, 2]
+    crops = [m["crop"] for m in index.format_matches(distances[0], indices[0])]
+    assert crops == ["rice", "maize", "maize"]
+
+
+def test_fully_labelled_index_keeps_row_positions():
+    index = _index([1, 0, 0, 1])
+    _, indices = index.query_nearest(index.transform([[90, 40, 40, 25, 6.5, 200]]), 2)
+    # Ties are broken by the lower row position.
+    assert list(indices[0]) == [0, 3]
+
+
+def _write_source(path, crops):
+    pd.DataFrame({
+        "state": ["punjab"] * len(crops),
+        "district": ["ludhiana"] * len(crops),
+        "season": ["kharif"] * len(crops),
+        "crop": crops,
+        "N_kg_ha": [90.0 - 10 * i for i in range(len(crops))],
+        "P_kg_ha": [40.0] * len(crops),
+        "K_kg_ha": [40.0] * len(crops),
+        "avg_temp_C": [25.0] * len(crops),
+        "soil_ph": [6.5] * len(crops),
+        "avg_rainfall_mm": [200.0] * len(crops),
+    }).to_parquet(path)
+
+
+@pytest.fixture
+def live_store(tmp_path, monkeypatch):
+    source = tmp_path / "all_crops.parquet"
+    monkeypatch.setattr(feature_store, "DATA_PATH", source)
+    monkeypatch.setattr(feature_store, "STORE_DIR", tmp_path / "store")
+    monkeypatch.setattr(feature_store, "FEATURE_STORE_CHECK_S", 0.0)
+    monkeypatch.setitem(feature_store._watch, "checked_at", None)
+    monkeypatch.setitem(feature_store._watch, "version", None)
+    feature_store.feature_store_resource.reset()
+    predictor.recommendation_cache.clear()
+    yield source
+    feature_store.feature_store_resource.reset()
+    predictor.recommendation_cache.clear()
+
+
+def test_rebuilt_store_drops_stale_recommendations(live_store):
+    _write_source(live_store, ["rice", "maize"])
+    assert predictor.get_top_matching_crops([90, 40, 40, 25, 6.5, 200], top_n=1)[0]["crop"] == "rice"
+    old_version = predictor.recommendation_cache.version
+    assert len(predictor.recommendation_cache) == 1
+
+    # Same input, rebuilt source: the cached "rice" must not be served again.
+    _write_source(live_store, ["wheat", "maize", "cotton"])
+    assert predictor.get_top_matching_crops([90, 40, 40, 25, 6.5, 200], top_n=1)[0]["crop"] == "wheat"
+    assert predictor.recommendation_cache.version != old_version
+    assert len(predictor.recommendation_cache) == 1
@@ -0,0 +1,41 @@
+import io
+
+import pytest
+from PIL import Image
+
+from backend.disease_model.preprocess import IMAGE_SIZE, decode_image
+
+
+def _encoded(mode, fmt, size=(500, 460)):
+    buffer = io.BytesIO()
+    Image.new(mode, size).save(buffer, fmt)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize("mode, fmt", [
+    ("P", "PNG"),
+    ("1", "PNG"),
+    ("I;16", "PNG"),
+    ("I", "TIFF"),
+    ("P", "GIF"),
+    ("RGBA", "PNG"),
+    ("L", "PNG"),
+])
+def test_decode_image_shrinks_any_mode_to_rgb(mode, fmt):
+    # 448px+ uploads take the reduce() path, which palette/1-bit/16-bit images cannot use directly.
+    image = decode_image(_encoded(mode, fmt))
+    assert image.mode == "RGB"
+    assert image.size == (250, 230)
+
+
+def test_decode_image_keeps_small_images():
+    image = decode_image(_encoded("P", "PNG", size=(300, 300)))
+    assert image.mode == "RGB"
+    assert image.size == (300, 300)
+
+
+def test_decode_image_jpeg_draft_stays_at_least_model_size():
+    image = decode_image(_encoded("RGB", "JPEG", size=(1800, 1800)))
+    assert image.size[0] >= IMAGE_SIZE[0] and image.size[1] >= IMAGE_SIZE[1]
+    assert image.size[0] < 1800
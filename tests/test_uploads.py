@@ -0,0 +1,82 @@
+import asyncio
+import io
+
+import httpx
+import pytest
+from fastapi import FastAPI, File, Form, UploadFile
+from PIL import Image
+
+from backend.community import uploads
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_DIR", tmp_path)
+    return tmp_path
+
+
+def _png():
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), "green").save(buf, "PNG")
+    return buf.getvalue()
+
+
+def test_extension_comes_from_the_image_bytes(upload_dir):
+    digest, url = uploads.store_upload(io.BytesIO(_png()), "leaf.jpg")
+    assert url == f"{uploads.UPLOAD_URL}/{digest}.png"
+    assert (upload_dir / f"{digest}.png").exists()
+
+
+def test_non_image_is_rejected_before_it_is_stored(upload_dir):
+    with pytest.raises(uploads.UploadRejected) as e:
+        uploads.store_upload(io.BytesIO(b"#!/bin/sh\necho not an image\n"), "leaf.jpg")
+    assert e.value.status_code == 415
+    assert list(upload_dir.iterdir()) == []
+
+
+def _limited_app(max_bytes):
+    app = FastAPI()
+    seen = []
+
+    @app.post("/upload")
+    async def upload(title: str = Form(...), image: UploadFile = File(...)):
+        seen.append(title)
+        return {"ok": True}
+
+    return uploads.UploadSizeLimit(app, paths=["/upload"], max_bytes=max_bytes), seen
+
+
+def _post(app, **kwargs):
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post("/upload", **kwargs)
+    return asyncio.run(main())
+
+
+def test_content_length_over_the_limit_is_refused_up_front():
+    app, seen = _limited_app(1024)
+    big = b"x" * (1024 + uploads.FORM_OVERHEAD_BYTES + 1)
+    response = _post(app, data={"title": "t"}, files={"image": ("a.png", big, "image/png")})
+    assert response.status_code == 413
+    assert seen == []
+
+
+def test_streamed_body_is_cut_off_at_the_limit():
+    app, seen = _limited_app(1024)
+
+    async def body():
+        # Chunked, so there is no Content-Length to check up front.
+        yield b'--b\r\nContent-Disposition: form-data; name="image"; filename="a.png"\r\n\r\n'
+        for _ in range(10):
+            yield b"x" * uploads.FORM_OVERHEAD_BYTES
+
+    response = _post(app, content=body(), headers={"content-type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
+    assert seen == []
+
+
+def test_small_upload_passes_through():
+    app, seen = _limited_app(1024)
+    response = _post(app, data={"title": "t"}, files={"image": ("a.png", _png(), "image/png")})
+    assert response.status_code == 200
+    assert seen == ["t"]
@@ -0,0 +1,144 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+from fastapi import FastAPI, Response
+
+from backend.services import weather
+
+
+def _payload(q):
+    return {
+        "location": {"name": "Stand-in", "region": "Test", "country": "India", "q": q},
+        "current": {"temp_c": 31.5, "humidity": 40, "wind_kph": 7.2,
+                    "condition": {"text": "Sunny", "icon": "//cdn/sunny.png"}},
+    }
+
+
+class StandIn:
+    """Local stand-in for the weather API: scripted status codes, delay and a request log."""
+
+    def __init__(self):
+        self.statuses = []
+        self.delay_s = 0.0
+        self.requests = []
+        self.app = FastAPI()
+
+        @self.app.get("/v1/current.json")
+        async def current(q: str, key: str, aqi: str = "no"):
+            self.requests.append(q)
+            if self.delay_s:
+                await asyncio.sleep(self.delay_s)
+            status = self.statuses.pop(0) if self.statuses else 200
+            if status != 200:
+                return Response(status_code=status, content=b"upstream busy")
+            return _payload(q)
+
+    def reset(self):
+        self.statuses, self.delay_s, self.requests = [], 0.0, []
+
+
+@pytest.fixture(scope="module")
+def stand_in():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server_app = StandIn()
+    server = uvicorn.Server(uvicorn.Config(server_app.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    server_app.base_url = f"http://127.0.0.1:{port}/v1"
+    yield server_app
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def upstream(stand_in, monkeypatch):
+    stand_in.reset()
+    monkeypatch.setattr(weather, "WEATHER_API_BASE_URL", stand_in.base_url)
+    monkeypatch.setattr(weather, "WEATHER_BACKOFF_S", 0.01)
+    monkeypatch.setattr(weather, "_client", None)
+    weather.weather_cache.clear()
+    weather._inflight.clear()
+    for name in weather.counters:
+        monkeypatch.setitem(weather.counters, name, 0)
+    return stand_in
+
+
+def _run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await weather.close_client()
+    return asyncio.run(main())
+
+
+def test_retries_with_jittered_backoff(upstream, monkeypatch):
+    upstream.statuses = [503, 429]
+    bounds = []
+
+    def uniform(low, high):
+        bounds.append((low, high))
+        return high / 2
+
+    monkeypatch.setattr(weather.random, "uniform", uniform)
+    result = _run(weather.get_weather_data(28.6139, 77.2090))
+
+    assert result["temperature_c"] == 31.5
+    assert len(upstream.requests) == 3
+    assert weather.counters["retries"] == 2
+    # Full jitter: each sleep is drawn from [0, backoff * 2**attempt].
+    assert bounds == [(0, 0.01), (0, 0.02)]
+
+
+def test_gives_up_after_retries(upstream):
+    upstream.statuses = [502] * (weather.WEATHER_RETRIES + 1)
+    with pytest.raises(weather.WeatherError, match="502"):
+        _run(weather.get_weather_data(28.6, 77.2))
+    assert len(upstream.requests) == weather.WEATHER_RETRIES + 1
+
+
+def test_timeout_raises_weather_error(upstream, monkeypatch):
+    monkeypatch.setattr(weather, "WEATHER_TIMEOUT_S", 0.1)
+    monkeypatch.setattr(weather, "WEATHER_RETRIES", 1)
+    upstream.delay_s = 0.5
+    started = time.perf_counter()
+    with pytest.raises(weather.WeatherError, match="Timeout"):
+        _run(weather.get_weather_data(28.6, 77.2))
+    assert time.perf_counter() - started < 1.0
+    assert weather.counters["upstream_calls"] == 2
+    assert len(weather.weather_cache) == 0
+
+
+def test_nearby_points_share_a_grid_cell(upstream):
+    async def lookups():
+        first = await weather.get_weather_data(28.6139, 77.2090)
+        second = await weather.get_weather_data(28.6101, 77.2049)
+        return first, second
+
+    hits = weather.weather_cache.hits
+    first, second = _run(lookups())
+    assert first == second
+    # One upstream call, made at the snapped point.
+    assert upstream.requests == ["28.6,77.2"]
+    assert weather.weather_cache.hits == hits + 1
+
+
+def test_concurrent_lookups_are_coalesced(upstream):
+    upstream.delay_s = 0.2
+
+    async def lookups():
+        return await asyncio.gather(*(weather.get_weather_data(28.61, 77.21) for _ in range(5)))
+
+    results = _run(lookups())
+    assert len(upstream.requests) == 1
+    assert weather.counters["coalesced"] == 4
+    assert all(r == results[0] for r in results)
+    assert weather._inflight == {}